@@ -7,13 +7,16 @@ import logging
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
-from datetime import timedelta
+from homeassistant.helpers.event import async_track_time_interval
+from datetime import datetime, timedelta
 
 
-from .const import DOMAIN, PLATFORMS
+from .const import ARCHIVE_FLUSH_INTERVAL, DOMAIN, OPTION_KEYS, PLATFORMS
 from .coordinator import CandyBiancaCoordinator
+from .cycle_stats import CycleStatistics
+from .log_util import redact
 from .services import async_setup_services
-
+from .triggers import async_setup_triggers
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -21,7 +24,15 @@ _LOGGER = logging.getLogger(__name__)
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up candy_bianca from a config entry."""
 
-    _LOGGER.info(f"Setting up integration with entry: {entry.data}")
+    _LOGGER.info("Setting up integration with entry: %s", redact(entry.data))
+
+    if not entry.options:
+        # Entries created before the options flow kept these settings in data
+        hass.config_entries.async_update_entry(
+            entry,
+            options={key: entry.data[key] for key in OPTION_KEYS if key in entry.data},
+        )
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
 
     coordinator = CandyBiancaCoordinator(hass, entry)
 
@@ -31,6 +42,27 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         f"Coordinator first refresh completed: {coordinator.last_update_success}"
     )
 
+    if unsub_triggers := async_setup_triggers(hass, entry, coordinator):
+        entry.async_on_unload(unsub_triggers)
+
+    if "recorder" in hass.config.components:
+        coordinator.statistics = CycleStatistics(hass, entry, coordinator)
+        await coordinator.statistics.async_load()
+        entry.async_on_unload(coordinator.statistics.async_start())
+
+    if coordinator.archive is not None:
+
+        async def _async_flush_archive(now: datetime) -> None:
+            await coordinator.async_flush_archive()
+
+        entry.async_on_unload(
+            async_track_time_interval(
+                hass,
+                _async_flush_archive,
+                timedelta(seconds=ARCHIVE_FLUSH_INTERVAL),
+            )
+        )
+
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = coordinator
     _LOGGER.info(
@@ -44,10 +76,18 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return True
 
 
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    _LOGGER.info(f"Unloading integration with entry: {entry.data}")
+    _LOGGER.info("Unloading integration with entry: %s", redact(entry.data))
 
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        if coordinator.statistics is not None:
+            await coordinator.statistics.async_flush()
+        await coordinator.async_flush_archive()
     return unload_ok
@@ -0,0 +1,158 @@
+"""Per-device request arbiter for candy_bianca integration."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+PRIORITY_WRITE = 0
+PRIORITY_POLL = 1
+
+
+class RequestArbiter:
+    """Serialize the requests sent to one appliance.
+
+    The WiFi boards do not cope with concurrent requests, so only one request
+    is in flight at a time. Waiting writes are always served before waiting
+    polls, and a poll is dropped when a write is queued or completes while it
+    waits, since the refresh that follows the write makes it redundant. The
+    caller must refresh after every write, including one that failed.
+
+    Listeners are called whenever the queue, the request in flight or the
+    wait metrics change.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the arbiter."""
+        self._busy = False
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._pending_writes = 0
+        self._write_generation = 0
+        self.dropped_polls = 0
+        self.last_wait = 0.0
+        self.max_wait = 0.0
+        self._listeners: list[Callable[[], None]] = []
+
+    def async_add_listener(
+        self, update_callback: Callable[[], None]
+    ) -> Callable[[], None]:
+        """Listen for metric changes; return a function removing the listener."""
+        self._listeners.append(update_callback)
+
+        def remove_listener() -> None:
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    def _notify(self) -> None:
+        """Call the listeners."""
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of requests waiting for their turn."""
+        return sum(1 for *_, waiter in self._waiters if not waiter.done())
+
+    @property
+    def metrics(self) -> dict[str, Any]:
+        """Return the arbiter metrics."""
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self._busy,
+            "last_wait": round(self.last_wait, 3),
+            "max_wait": round(self.max_wait, 3),
+            "dropped_polls": self.dropped_polls,
+        }
+
+    async def _acquire(self, priority: int) -> None:
+        """Wait until the caller may send its request."""
+        if not self._busy and not self._waiters:
+            self._busy = True
+            self._notify()
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), waiter))
+        self._notify()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The turn was handed over just before the cancellation
+                self._release()
+            else:
+                self._notify()
+            raise
+
+    def _release(self) -> None:
+        """Hand the device over to the next waiter, if any."""
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                self._notify()
+                return
+        self._busy = False
+        self._notify()
+
+    def _record_wait(self, queued: float) -> None:
+        """Record how long a request waited for its turn."""
+        self.last_wait = time.monotonic() - queued
+        self.max_wait = max(self.max_wait, self.last_wait)
+        self._notify()
+
+    def _drop_poll(self, reason: str) -> None:
+        """Count a poll made redundant by a write."""
+        self.dropped_polls += 1
+        _LOGGER.debug("Poll dropped, %s", reason)
+        self._notify()
+
+    async def _run(self, priority: int, job: Callable[[], Awaitable[_T]]) -> _T:
+        """Run a job once it is its turn and record how long it waited."""
+        queued = time.monotonic()
+        await self._acquire(priority)
+        try:
+            self._record_wait(queued)
+            return await job()
+        finally:
+            self._release()
+
+    async def async_write(self, job: Callable[[], Awaitable[_T]]) -> _T:
+        """Run a write ahead of any waiting poll."""
+        self._pending_writes += 1
+        try:
+            result = await self._run(PRIORITY_WRITE, job)
+            # Only a write that went through makes the waiting polls redundant
+            self._write_generation += 1
+            return result
+        finally:
+            self._pending_writes -= 1
+
+    async def async_poll(self, job: Callable[[], Awaitable[_T]]) -> _T | None:
+        """Run a poll, or return None if a write made it redundant."""
+        if self._pending_writes:
+            self._drop_poll("a write is queued")
+            return None
+
+        generation = self._write_generation
+        queued = time.monotonic()
+        await self._acquire(PRIORITY_POLL)
+        try:
+            if self._pending_writes or generation != self._write_generation:
+                self._drop_poll("a write was sent while it waited")
+                return None
+            self._record_wait(queued)
+            return await job()
+        finally:
+            self._release()
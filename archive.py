@@ -0,0 +1,164 @@
+"""Compressed on-disk archive of appliance payloads for candy_bianca.
+
+Each device gets a directory of segment files. A batch of records is written
+as one gzip member appended to the current segment, and the position and
+time span of every member is kept in a small index, so a time range is read
+back one batch at a time without decompressing whole segments.
+
+All methods do blocking file I/O and must run in the executor. This module
+must not import homeassistant.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import threading
+from collections.abc import Iterator
+
+_LOGGER = logging.getLogger(__name__)
+
+INDEX_FILE = "index.jsonl"
+DEFAULT_SEGMENT_BYTES = 1024 * 1024
+DEFAULT_TOTAL_BYTES = 64 * 1024 * 1024
+
+
+def make_archive_record(timestamp: float, payload: str, data: dict | None) -> dict:
+    """Build an archive record for a raw payload and its decoded document."""
+    return {"t": round(timestamp, 3), "p": payload, "d": data}
+
+
+class PayloadArchive:
+    """Size bounded archive of the payloads of one device."""
+
+    def __init__(
+        self,
+        directory: str,
+        max_segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+        max_total_bytes: int = DEFAULT_TOTAL_BYTES,
+    ) -> None:
+        """Initialize the archive; the directory is created on first write."""
+        self.directory = directory
+        self._max_segment_bytes = max_segment_bytes
+        self._max_total_bytes = max_total_bytes
+        self._lock = threading.Lock()
+        self._index: list[dict] | None = None
+
+    def _path(self, name: str) -> str:
+        """Return the path of a file in the archive directory."""
+        return os.path.join(self.directory, name)
+
+    def _load_index(self) -> list[dict]:
+        """Return the index, reading it from disk the first time."""
+        if self._index is None:
+            self._index = []
+            try:
+                with open(self._path(INDEX_FILE), encoding="utf-8") as index:
+                    self._index = [json.loads(line) for line in index if line.strip()]
+            except FileNotFoundError:
+                pass
+        return self._index
+
+    def _segment_sizes(self) -> dict[str, int]:
+        """Return the bytes used by each segment, oldest first."""
+        sizes: dict[str, int] = {}
+        for entry in self._load_index():
+            sizes[entry["seg"]] = entry["off"] + entry["len"]
+        return sizes
+
+    def append_batch(self, records: list[dict]) -> None:
+        """Append records, ordered by time, as one compressed member."""
+        if not records:
+            return
+        blob = gzip.compress(
+            "".join(
+                json.dumps(record, separators=(",", ":")) + "\n" for record in records
+            ).encode()
+        )
+
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            index = self._load_index()
+            segment = index[-1]["seg"] if index else None
+            if segment is None or (
+                index[-1]["off"] + index[-1]["len"] >= self._max_segment_bytes
+            ):
+                segment = f"seg-{int(records[0]['t'] * 1000)}.gz"
+
+            path = self._path(segment)
+            offset = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(path, "ab") as segment_file:
+                segment_file.write(blob)
+
+            entry = {
+                "seg": segment,
+                "off": offset,
+                "len": len(blob),
+                "first": records[0]["t"],
+                "last": records[-1]["t"],
+                "n": len(records),
+            }
+            index.append(entry)
+            with open(self._path(INDEX_FILE), "a", encoding="utf-8") as index_file:
+                index_file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+            self._prune()
+
+    def _prune(self) -> None:
+        """Delete the oldest segments while the archive is over its size bound."""
+        sizes = self._segment_sizes()
+        total = sum(sizes.values())
+        removed = set()
+        # Never delete the segment being written to
+        for segment, size in list(sizes.items())[:-1]:
+            if total <= self._max_total_bytes:
+                break
+            try:
+                os.remove(self._path(segment))
+            except FileNotFoundError:
+                pass
+            removed.add(segment)
+            total -= size
+
+        if not removed:
+            return
+        self._index = [entry for entry in self._index if entry["seg"] not in removed]
+        tmp_path = self._path(INDEX_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as index_file:
+            for entry in self._index:
+                index_file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        os.replace(tmp_path, self._path(INDEX_FILE))
+        _LOGGER.debug("Pruned archive segments %s", sorted(removed))
+
+    def iter_range(self, start: float, end: float) -> Iterator[dict]:
+        """Yield the records with start <= time <= end, oldest first."""
+        with self._lock:
+            entries = [
+                entry
+                for entry in self._load_index()
+                if entry["last"] >= start and entry["first"] <= end
+            ]
+
+        for entry in entries:
+            try:
+                with open(self._path(entry["seg"]), "rb") as segment_file:
+                    segment_file.seek(entry["off"])
+                    blob = segment_file.read(entry["len"])
+            except FileNotFoundError:
+                # Pruned since the index was read
+                continue
+            for line in gzip.decompress(blob).splitlines():
+                record = json.loads(line)
+                if start <= record["t"] <= end:
+                    yield record
+
+    def export_range(self, start: float, end: float, path: str) -> int:
+        """Write the records of a time range to a JSON lines file."""
+        count = 0
+        with open(path, "w", encoding="utf-8") as export:
+            for record in self.iter_range(start, end):
+                export.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+        return count
@@ -0,0 +1,133 @@
+"""Per-refresh logging overhead of the sensors, before and after log_util.
+
+Simulates the logging done by the sensors of one washing machine on every
+coordinator refresh, with the integration logger at WARNING (the Home
+Assistant default) and a handler that discards records:
+
+    python benchmarks/bench_logging.py [--refreshes 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import logging
+import pathlib
+import time
+
+_ROOT = pathlib.Path(__file__).resolve().parent.parent
+_spec = importlib.util.spec_from_file_location("log_util", _ROOT / "log_util.py")
+log_util = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(log_util)
+
+FIELDS = [
+    "StatoLavatrice",
+    "WiFiStatus",
+    "Err",
+    "MachMd",
+    "Pr",
+    "PrPh",
+    "PrCode",
+    "SLevel",
+    "Temp",
+    "SpinSp",
+    "Opt1",
+    "Opt2",
+    "Opt3",
+    "Opt4",
+    "Opt5",
+    "Opt6",
+    "Opt7",
+    "Opt8",
+    "Opt9",
+    "Steam",
+    "DryT",
+    "DelVal",
+    "RemTime",
+    "RecipeId",
+    "Lang",
+    "FillR",
+    "DisTestOn",
+    "DisTestRes",
+    "CheckUpState",
+]
+# Firmware that does not report a few of the fields
+STATUS = {field: "1" for field in FIELDS[:-4]}
+
+
+class _Discard(logging.Handler):
+    """Handler counting and dropping records."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.count += 1
+        self.format(record)
+
+
+def refresh_eager(logger: logging.Logger) -> None:
+    """Logging as done before: f-strings and a warning per missing field."""
+    for field in FIELDS:
+        state = STATUS.get(field)
+        logger.debug(f"Sensor: {field}, Raw Value: {state}")
+        if state is None:
+            logger.warning(
+                f"Sensor state is None for sensor_type '{field}'. Raw state data: {STATUS.get(field)}"
+            )
+
+
+def refresh_lazy(loggers: dict[str, log_util.DeviceLogger]) -> None:
+    """Logging through DeviceLogger, as the sensors do now."""
+    for field in FIELDS:
+        state = STATUS.get(field)
+        log = loggers[field]
+        log.trace("Sensor: %s, Raw Value: %s", field, state)
+        if state is None:
+            log.warning(
+                "state_none",
+                "Sensor state is None for sensor_type '%s'. Raw state data: %s",
+                field,
+                state,
+            )
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--refreshes", type=int, default=20000)
+    args = parser.parse_args()
+
+    logger = logging.getLogger("bench.candy_bianca")
+    logger.propagate = False
+    logger.setLevel(logging.WARNING)
+    handler = _Discard()
+    logger.addHandler(handler)
+    loggers = {
+        field: log_util.DeviceLogger(logger, f"Washer {field}") for field in FIELDS
+    }
+
+    results = {}
+    for name, run in (
+        ("eager", lambda: refresh_eager(logger)),
+        ("lazy", lambda: refresh_lazy(loggers)),
+    ):
+        handler.count = 0
+        started = time.perf_counter()
+        for _ in range(args.refreshes):
+            run()
+        elapsed = time.perf_counter() - started
+        results[name] = elapsed / args.refreshes * 1e6
+        print(
+            f"{name:>5}: {results[name]:7.2f} us/refresh, "
+            f"{handler.count / args.refreshes:.2f} records/refresh"
+        )
+    print(
+        f"saved {results['eager'] - results['lazy']:.2f} us/refresh "
+        f"({results['eager'] / results['lazy']:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Command line tool polling Candy Bianca appliances without Home Assistant.
+
+Run it as a script so that the integration package (which imports
+homeassistant) is not loaded:
+
+    python cli.py poll 192.168.1.20 192.168.1.64/28 --rate 5
+    python cli.py decode trace.jsonl --encrypted --key KEY --repeat 100
+    python cli.py send 192.168.1.20 "Eco 45°C" --device-type statusDWash --eco
+
+poll streams one JSON object per appliance and poll to stdout; decode runs
+recorded payloads through the decode and translation path and reports its
+throughput on stderr; send starts a program given by name.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import ipaddress
+import json
+import sys
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+if __package__:
+    from .protocol import (
+        DEVICE_TYPES,
+        AsyncCandyBiancaClient,
+        CandyBiancaClient,
+        PayloadError,
+        decode_payload,
+        translate_status,
+    )
+else:  # Executed as a script
+    from protocol import (
+        DEVICE_TYPES,
+        AsyncCandyBiancaClient,
+        CandyBiancaClient,
+        PayloadError,
+        decode_payload,
+        translate_status,
+    )
+
+
+def expand_targets(targets: list[str]) -> Iterator[str]:
+    """Expand IP addresses and CIDR ranges to the host addresses they cover."""
+    for target in targets:
+        if "/" in target:
+            for address in ipaddress.ip_network(target, strict=False).hosts():
+                yield str(address)
+        else:
+            yield target
+
+
+def _device_type(data: dict | None, default: str | None) -> str | None:
+    """Return the device type of a decoded document."""
+    if default:
+        return default
+    if data:
+        for device_type in DEVICE_TYPES:
+            if device_type in data:
+                return device_type
+    return None
+
+
+def _emit(record: dict) -> None:
+    """Write one JSON line to stdout."""
+    sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+class RateLimiter:
+    """Space the start of requests to at most rate per second."""
+
+    def __init__(self, rate: float) -> None:
+        """Initialize the limiter; a rate of 0 disables it."""
+        self._interval = 1 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        """Wait for the next request slot."""
+        if not self._interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+                now = self._next
+            self._next = now + self._interval
+
+
+async def _poll_one(
+    client: AsyncCandyBiancaClient,
+    limiter: RateLimiter,
+    semaphore: asyncio.Semaphore,
+    args: argparse.Namespace,
+) -> None:
+    """Poll one appliance and emit its snapshot."""
+    async with semaphore:
+        await limiter.wait()
+        record: dict = {"ip": client.client.ip_address, "time": time.time()}
+        started = time.monotonic()
+        try:
+            response = await client.fetch()
+        except Exception as e:  # noqa: BLE001 - reported in the output
+            record["latency"] = round(time.monotonic() - started, 4)
+            record["error"] = str(e)
+            _emit(record)
+            return
+
+        record["latency"] = round(time.monotonic() - started, 4)
+        record["status"] = response.status_code
+        if not response.ok:
+            record["error"] = f"HTTP {response.status_code}"
+            _emit(record)
+            return
+        # One odd appliance must not stop the polling of the others
+        try:
+            data = decode_payload(
+                response.text.strip(), client.client.encrypted, client.client.key
+            )
+            if args.translate and (device_type := _device_type(data, args.device_type)):
+                data = translate_status(device_type, data)
+        except PayloadError as e:
+            record["error"] = f"undecodable response: {e}"
+        except Exception as e:  # noqa: BLE001 - reported in the output
+            record["error"] = f"untranslatable response: {e!r}"
+        else:
+            record["data"] = data
+        _emit(record)
+
+
+async def _async_poll(args: argparse.Namespace) -> None:
+    """Poll all targets, round after round."""
+    clients = [
+        AsyncCandyBiancaClient(ip, args.encrypted, args.key, args.timeout)
+        for ip in expand_targets(args.targets)
+    ]
+    limiter = RateLimiter(args.rate)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    loop = asyncio.get_running_loop()
+    # The clients run in the default executor, make it as wide as the polling
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=args.concurrency))
+
+    rounds = 0
+    try:
+        while True:
+            started = time.monotonic()
+            await asyncio.gather(
+                *(_poll_one(client, limiter, semaphore, args) for client in clients)
+            )
+            rounds += 1
+            if args.count and rounds >= args.count:
+                break
+            await asyncio.sleep(max(args.interval - (time.monotonic() - started), 0))
+    finally:
+        for client in clients:
+            client.close()
+
+
+def _decode(args: argparse.Namespace) -> None:
+    """Decode the payloads of a trace file and report the throughput."""
+    with open(args.trace, encoding="utf-8") as trace:
+        payloads = [json.loads(line)["p"] for line in trace if line.strip()]
+    payloads = [payload for payload in payloads if payload]
+    if not payloads:
+        print("No payloads in trace", file=sys.stderr)
+        return
+
+    decoded = 0
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        for payload in payloads:
+            try:
+                data = decode_payload(payload, args.encrypted, args.key)
+                if device_type := _device_type(data, args.device_type):
+                    data = translate_status(device_type, data)
+            except (PayloadError, TypeError, ValueError):
+                continue
+            decoded += 1
+            if args.repeat == 1:
+                _emit(data)
+    elapsed = time.perf_counter() - started
+
+    total = len(payloads) * args.repeat
+    print(
+        f"{total} payloads, {decoded} decoded in {elapsed:.3f}s "
+        f"({total / elapsed:.0f}/s, {elapsed / total * 1e6:.1f}us each)",
+        file=sys.stderr,
+    )
+
+
+def _send(args: argparse.Namespace) -> int:
+    """Send a program to one appliance and emit its response."""
+    client = CandyBiancaClient(args.target, args.encrypted, args.key, args.timeout)
+    record: dict = {"ip": args.target, "program": args.program}
+    try:
+        record["response"] = client.send_program(
+            args.device_type,
+            args.program,
+            eco=args.eco,
+            treinuno=args.treinuno,
+            extradry=args.extradry,
+            startstop=args.startstop,
+            metacarico=args.metacarico,
+        )
+    except Exception as e:  # noqa: BLE001 - reported in the output
+        record["error"] = str(e)
+    finally:
+        client.close()
+    _emit(record)
+    return 1 if "error" in record else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the command line tool."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--encrypted", action="store_true")
+    common.add_argument("--key", default="")
+    common.add_argument("--device-type", choices=DEVICE_TYPES)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    poll = subparsers.add_parser("poll", parents=[common], help="poll appliances")
+    poll.add_argument("targets", nargs="+", help="IP addresses or CIDR ranges")
+    poll.add_argument(
+        "--rate", type=float, default=10, help="requests per second, 0 for no limit"
+    )
+    poll.add_argument("--concurrency", type=int, default=32)
+    poll.add_argument("--timeout", type=float, default=5)
+    poll.add_argument(
+        "--interval", type=float, default=30, help="seconds between polling rounds"
+    )
+    poll.add_argument(
+        "--count", type=int, default=1, help="polling rounds, 0 to poll forever"
+    )
+    poll.add_argument("--translate", action="store_true", help="emit translated values")
+
+    decode = subparsers.add_parser(
+        "decode", parents=[common], help="decode the payloads of a trace file"
+    )
+    decode.add_argument("trace", help="trace file written by the trace_file option")
+    decode.add_argument(
+        "--repeat", type=int, default=1, help="decode the trace this many times"
+    )
+
+    send = subparsers.add_parser(
+        "send", parents=[common], help="send a program to an appliance"
+    )
+    send.add_argument("target", help="IP address")
+    send.add_argument("program", help="program name, or raw program such as P5")
+    send.add_argument("--timeout", type=float, default=5)
+    for option in ("eco", "treinuno", "extradry", "startstop", "metacarico"):
+        send.add_argument(f"--{option}", action="store_const", const="1", default="0")
+
+    args = parser.parse_args(argv)
+    if args.command == "send" and not args.device_type:
+        parser.error("send needs --device-type")
+    try:
+        if args.command == "poll":
+            asyncio.run(_async_poll(args))
+        elif args.command == "send":
+            return _send(args)
+        else:
+            _decode(args)
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,14 +6,18 @@ import logging
 from typing import Any
 import asyncio
 
+import requests
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import selector
 
-from .const import DOMAIN
+from .const import DEFAULT_POWER_THRESHOLD, DEFAULT_SCAN_INTERVAL, DOMAIN
+from .protocol import DEVICE_TYPES, CandyBiancaClient, recover_key
+from .triggers import parse_trigger_entities
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -30,20 +34,63 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         errors: dict[str, str] = {}
 
         if user_input is not None:
-            try:
-                return self.async_create_entry(
-                    title=user_input["name"], data=user_input
-                )
-            except Exception as e:
-                _LOGGER.error(f"Error during config flow: {e}")
-                errors["base"] = "unknown"
+            user_input = dict(user_input)
+            response = user_input.pop("encrypted_response", "").strip()
+            if user_input.get("encrypted") and not user_input.get("key"):
+                key = await self._async_recover_key(user_input, response)
+                if key:
+                    user_input["key"] = key
+                else:
+                    errors["key"] = "key_recovery_failed"
+
+            trace_file = user_input.get("trace_file")
+            if trace_file and not self.hass.config.is_allowed_path(
+                self.hass.config.path(trace_file)
+            ):
+                errors["trace_file"] = "path_not_allowed"
+
+            if not errors:
+                try:
+                    return self.async_create_entry(
+                        title=user_input["name"], data=user_input
+                    )
+                except Exception as e:
+                    _LOGGER.error(f"Error during config flow: {e}")
+                    errors["base"] = "unknown"
 
         return self.async_show_form(
             step_id="user",
-            data_schema=self._get_schema(),
+            data_schema=self._get_schema(user_input),
             errors=errors,
         )
 
+    async def _async_recover_key(
+        self, user_input: dict[str, Any], response: str
+    ) -> str | None:
+        """Recover the key from a pasted or freshly read encrypted response."""
+        if not response:
+            client = CandyBiancaClient(user_input["ip_address"], encrypted=True)
+            try:
+                result = await self.hass.async_add_executor_job(client.fetch)
+                result.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                _LOGGER.error(f"Could not read encrypted response: {e}")
+                return None
+            finally:
+                client.close()
+            response = result.text
+
+        device_type = user_input["device_type"]
+        device_types = (device_type,) + tuple(
+            other for other in DEVICE_TYPES if other != device_type
+        )
+        key = await self.hass.async_add_executor_job(
+            recover_key, response, device_types
+        )
+        if key is None:
+            _LOGGER.error("Could not recover the key from the encrypted response")
+        return key
+
     def _get_schema(self, user_input: dict[str, Any] | None = None) -> vol.Schema:
         """Get the data schema."""
         if not user_input:
@@ -66,9 +113,60 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     "encrypted", default=user_input.get("encrypted", False)
                 ): bool,
                 vol.Optional("key", default=user_input.get("key", "")): str,
+                vol.Optional("encrypted_response", default=""): str,
+                vol.Optional(
+                    "trace_file", default=user_input.get("trace_file", "")
+                ): str,
+                vol.Optional("archive", default=user_input.get("archive", False)): bool,
             }
         )
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> OptionsFlowHandler:
+        """Return the options flow."""
+        return OptionsFlowHandler(config_entry)
+
     async def _test_tcp_connection(self, ip_address: str) -> bool:
         """Test if the device is reachable via TCP connection on port 80."""
         return True
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle the options of a candy_bianca device."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize the options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the polling interval and the refresh triggers."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        "scan_interval",
+                        default=options.get("scan_interval", DEFAULT_SCAN_INTERVAL),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=5)),
+                    vol.Optional(
+                        "trigger_entities",
+                        default=parse_trigger_entities(options.get("trigger_entities")),
+                    ): selector.EntitySelector(
+                        selector.EntitySelectorConfig(multiple=True)
+                    ),
+                    vol.Optional(
+                        "power_threshold",
+                        default=options.get("power_threshold", DEFAULT_POWER_THRESHOLD),
+                    ): vol.Coerce(float),
+                }
+            ),
+        )
@@ -2,3 +2,17 @@
 
 DOMAIN = "candy_bianca"
 PLATFORMS = ["sensor"]
+
+DEFAULT_SCAN_INTERVAL = 30
+# Settings changed in the options flow; older entries kept them in data
+OPTION_KEYS = ("scan_interval", "trigger_entities", "power_threshold")
+# How often the countdown entities refresh between polls, in seconds
+COUNTDOWN_INTERVAL = 15
+# Shortest gap between two refreshes triggered by other entities, in seconds
+TRIGGER_COOLDOWN = 5
+# Value (e.g. power in W) a numeric trigger entity must cross to refresh
+DEFAULT_POWER_THRESHOLD = 5.0
+# Payloads buffered before they are written to the archive, and the longest
+# time in seconds a payload stays buffered
+ARCHIVE_BATCH_SIZE = 60
+ARCHIVE_FLUSH_INTERVAL = 900
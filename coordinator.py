@@ -3,8 +3,7 @@
 from __future__ import annotations
 
 import logging
-import json
-import binascii
+import time
 from datetime import timedelta
 
 
@@ -15,6 +14,13 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.exceptions import ConfigEntryNotReady
 
+from .arbiter import RequestArbiter
+from .archive import PayloadArchive, make_archive_record
+from .const import ARCHIVE_BATCH_SIZE, DEFAULT_SCAN_INTERVAL, DOMAIN
+from .countdown import RemainingTimeEstimator, is_running, phase
+from .log_util import DeviceLogger
+from .protocol import CandyBiancaClient, PayloadError, decode_payload
+from .replay import TraceRecorder, make_record
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -29,66 +35,147 @@ class CandyBiancaCoordinator(DataUpdateCoordinator):
         self._encrypted = entry.data["encrypted"]
         self._key = entry.data["key"]
         self._device_type = entry.data["device_type"]
+        self.client = CandyBiancaClient(self._ip_address, self._encrypted, self._key)
         self.json_data = None
+        self.log = DeviceLogger(_LOGGER, entry.data["name"])
+        self.last_payload_time: float | None = None
+        self.countdown = RemainingTimeEstimator()
+        # Replaced by a virtual clock while a trace is replayed
+        self.clock = time.time
+        self.replaying = False
+
+        trace_file = entry.data.get("trace_file")
+        # Relative paths are relative to the configuration directory
+        self.recorder = (
+            TraceRecorder(hass.config.path(trace_file)) if trace_file else None
+        )
+        self.arbiter = RequestArbiter()
+        self.archive = (
+            PayloadArchive(hass.config.path(DOMAIN, "archive", entry.entry_id))
+            if entry.data.get("archive")
+            else None
+        )
+        self._archive_buffer: list[dict] = []
+        # Set up by the integration when the recorder is loaded
+        self.statistics = None
 
         super().__init__(
             hass,
             _LOGGER,
             name=f"Candy Bianca {entry.data['name']}",
-            update_interval=timedelta(seconds=30),
+            update_interval=timedelta(
+                seconds=entry.options.get("scan_interval", DEFAULT_SCAN_INTERVAL)
+            ),
         )
         _LOGGER.info(
             f"Coordinator initialized: {self.name}, update_interval: {self.update_interval}"
         )
 
+    def process_payload(self, hex_data: str, timestamp: float) -> dict | None:
+        """Decode a raw payload and make it the current snapshot."""
+        try:
+            data = decode_payload(hex_data, self._encrypted, self._key)
+        except PayloadError as e:
+            self.log.error("payload", "Could not decode payload: %s", e)
+            return None
+        self.log.clear("payload")
+        self.json_data = data
+        self.last_payload_time = timestamp
+
+        status = data.get(self._device_type, {})
+        try:
+            remaining = int(status.get("RemTime"))
+        except (ValueError, TypeError):
+            remaining = None
+        self.countdown.resync(
+            remaining,
+            timestamp,
+            is_running(self._device_type, status),
+            phase(self._device_type, status),
+        )
+        return self.json_data
+
+    async def _async_record(
+        self, timestamp: float, latency: float, status: int, payload: str
+    ) -> None:
+        """Append a raw response to the trace file when recording is enabled."""
+        if self.recorder is None:
+            return
+        try:
+            await self.hass.async_add_executor_job(
+                self.recorder.append, make_record(timestamp, latency, status, payload)
+            )
+        except OSError as e:
+            self.log.error(
+                "trace", "Error writing trace file %s: %s", self.recorder.path, e
+            )
+
+    def _archive(self, timestamp: float, payload: str, data: dict | None) -> None:
+        """Buffer a payload for the archive, flushing full batches in the background."""
+        if self.archive is None or self.replaying:
+            return
+        self._archive_buffer.append(make_archive_record(timestamp, payload, data))
+        if len(self._archive_buffer) >= ARCHIVE_BATCH_SIZE:
+            self.hass.async_create_background_task(
+                self.async_flush_archive(), f"{self.name} archive flush"
+            )
+
+    async def async_flush_archive(self) -> None:
+        """Write the buffered payloads to the archive."""
+        if self.archive is None or not self._archive_buffer:
+            return
+        batch, self._archive_buffer = self._archive_buffer, []
+        try:
+            await self.hass.async_add_executor_job(self.archive.append_batch, batch)
+        except OSError as e:
+            self.log.error("archive", "Error writing payload archive: %s", e)
+
+    async def async_write(self, url: str) -> requests.Response:
+        """Send a write request ahead of queued polls, then refresh."""
+        try:
+            response = await self.arbiter.async_write(
+                lambda: self.hass.async_add_executor_job(self.client.get, url)
+            )
+        except BaseException:
+            # Polls dropped while the write was queued still need a refresh
+            self.hass.async_create_background_task(
+                self.async_request_refresh(), f"{self.name} refresh"
+            )
+            raise
+        await self.async_request_refresh()
+        return response
+
     async def _async_update_data(self):
         """Fetch data from the api."""
-        _LOGGER.debug(f"Fetching data for {self._entry.data['name']}")
+        self.log.debug("Fetching data")
+        started = time.time()
         try:
-            url = f"http://{self._ip_address}/http-read.json?encrypted={'1' if self._encrypted else '0'}"
 
-            response = await self.hass.async_add_executor_job(requests.get, url)
-            response.raise_for_status()
+            async def _fetch() -> requests.Response:
+                nonlocal started
+                started = time.time()
+                return await self.hass.async_add_executor_job(self.client.fetch)
 
+            response = await self.arbiter.async_poll(_fetch)
+            if response is None:
+                # A write is going out and will be followed by a refresh
+                return self.data
+            latency = time.time() - started
             hex_data = response.text.strip()
+            await self._async_record(started, latency, response.status_code, hex_data)
+            response.raise_for_status()
+            self.log.clear("request")
 
-            # XOR Decryption
-            if self._encrypted and self._key:
-                try:
-                    key = self._key
-                    key_bytes = key.encode()
-
-                    if len(hex_data) % 2 != 0:
-                        _LOGGER.error(f"Odd length hex string before xor: {hex_data}")
-                        return None
-
-                    data_bytes = binascii.unhexlify(hex_data)
-                    decrypted_data_bytes = bytearray()
-
-                    for i, byte in enumerate(data_bytes):
-                        decrypted_data_bytes.append(
-                            byte ^ key_bytes[i % len(key_bytes)]
-                        )
-
-                    decrypted_data = decrypted_data_bytes.decode(
-                        "utf-8", errors="ignore"
-                    )
-                except Exception as xor_err:
-                    _LOGGER.error(f"XOR Decryption Error {xor_err}")
-                    return None
-            else:
-                decrypted_data = hex_data
-
-            try:
-                self.json_data = json.loads(decrypted_data)
-                return self.json_data
-            except json.JSONDecodeError:
-                _LOGGER.error("Invalid JSON response")
-                return None
+            data = self.process_payload(hex_data, started)
+            self._archive(started, hex_data, data)
+            return data
 
         except requests.exceptions.RequestException as e:
-            _LOGGER.error(f"Error during request: {e}")
+            self.log.error("request", "Error during request: %s", e)
+            if e.response is None:
+                # No response at all (timeout, refused): record it as status 0
+                await self._async_record(started, time.time() - started, 0, "")
             return None
         except Exception as e:
-            _LOGGER.error(f"An unexpected error occurred: {e}")
+            self.log.error("unexpected", "An unexpected error occurred: %s", e)
             return None
@@ -0,0 +1,97 @@
+"""Local remaining time countdown for candy_bianca integration."""
+
+from __future__ import annotations
+
+# Fields that tell whether a program is currently running
+RUNNING_STATES = {
+    "statusDWash": ("StatoDWash", {"1", "2", "3", "4"}),
+    "statusLavatrice": ("MachMd", {"2"}),
+}
+
+# Field holding the current phase of the program
+PHASE_FIELDS = {"statusDWash": "StatoDWash", "statusLavatrice": "PrPh"}
+
+# Bounds for the appliance minutes counted per wall clock minute
+MIN_RATE = 0.5
+MAX_RATE = 2.0
+
+# Shortest poll gap used to estimate the rate; RemTime only has minute resolution
+MIN_RATE_SAMPLE = 120.0
+
+
+def is_running(device_type: str, status: dict) -> bool:
+    """Return True if the status reports a program in progress."""
+    field, running = RUNNING_STATES.get(device_type, (None, set()))
+    return status.get(field) in running
+
+
+def phase(device_type: str, status: dict) -> str | None:
+    """Return the current program phase reported in the status."""
+    return status.get(PHASE_FIELDS.get(device_type))
+
+
+class RemainingTimeEstimator:
+    """Estimate the remaining time between polls from the last snapshot.
+
+    Appliances do not count RemTime down in real minutes: heating phases
+    stall it and it can jump when a phase ends early. Right after a poll the
+    estimate is the reported RemTime; between polls it is decremented by an
+    exponentially smoothed rate of appliance minutes per wall clock minute.
+    The rate is learned within a phase and starts again from 1.0 when the
+    phase changes, so a stall in one phase does not slow down the next.
+    """
+
+    def __init__(self, smoothing: float = 0.3) -> None:
+        """Initialize the estimator."""
+        self._smoothing = smoothing
+        self.rate = 1.0
+        self.running = False
+        self._reported: int | None = None
+        self._synced_at: float | None = None
+        self._phase: str | None = None
+        self.end_time: float | None = None
+
+    def resync(
+        self,
+        remaining: int | None,
+        timestamp: float,
+        running: bool,
+        phase: str | None = None,
+    ) -> None:
+        """Take a reported RemTime (in minutes) as the new reference."""
+        if remaining is None:
+            self._reported = None
+            self._synced_at = None
+            self._phase = None
+            self.end_time = None
+            self.running = False
+            return
+
+        if self._reported is not None and self._synced_at is not None:
+            elapsed = timestamp - self._synced_at
+            if remaining > self._reported or phase != self._phase:
+                # New cycle or phase, or the appliance extended the program
+                self.rate = 1.0
+            elif running and self.running and elapsed >= MIN_RATE_SAMPLE:
+                observed = (self._reported - remaining) / (elapsed / 60)
+                observed = min(max(observed, MIN_RATE), MAX_RATE)
+                self.rate += self._smoothing * (observed - self.rate)
+
+        self._reported = remaining
+        self._synced_at = timestamp
+        self._phase = phase
+        self.running = running
+        if running:
+            self.end_time = timestamp + remaining / self.rate * 60
+        else:
+            self.end_time = None
+
+    def remaining(self, now: float) -> int | None:
+        """Return the estimated remaining minutes at the given time."""
+        if self._reported is None:
+            return None
+        if self.end_time is None:
+            return self._reported
+        elapsed = max(now - self._synced_at, 0.0)
+        minutes = max(self._reported - self.rate * elapsed / 60, 0.0)
+        return int(-(-minutes // 1))
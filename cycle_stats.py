@@ -0,0 +1,272 @@
+"""Cycle statistics imported into the recorder for candy_bianca integration."""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timezone
+from typing import Any
+
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_change
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
+
+from .const import DOMAIN
+from .coordinator import CandyBiancaCoordinator
+from .countdown import is_running
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+# Delay before the cycle in progress is saved after it changes, in seconds
+SAVE_DELAY = 10
+
+# Field holding the program and the error code, and the codes meaning no error
+PROGRAM_FIELDS = {"statusDWash": "Program", "statusLavatrice": "Pr"}
+ERROR_FIELDS = {
+    "statusDWash": ("CodiceErrore", {"0", "E0"}),
+    "statusLavatrice": ("Err", {"0"}),
+}
+
+
+def _hour_start(timestamp: float) -> datetime:
+    """Return the start of the UTC hour containing the timestamp."""
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).replace(
+        minute=0, second=0, microsecond=0
+    )
+
+
+class CycleStatistics:
+    """Aggregate finished cycles per hour and import them as external statistics.
+
+    Totals are kept incrementally as cycles finish and stored between
+    restarts, so the hourly rows are imported in batches without ever
+    reading back the state history of the entities. The cycle in progress
+    is stored too, so a restart during a cycle does not cut it short.
+
+    Runtime is credited on every update to the hour the update falls in, so
+    a long cycle is spread over the hours it ran in (to within one poll;
+    a gap while Home Assistant was down goes to the first update after it).
+    The cycle itself, its program and its duration count in the hour it
+    ends.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        coordinator: CandyBiancaCoordinator,
+    ) -> None:
+        """Initialize the statistics."""
+        self._hass = hass
+        self._coordinator = coordinator
+        self._device_type = entry.data["device_type"]
+        self._name = entry.data["name"]
+        self._prefix = f"{DOMAIN}:{slugify(entry.data['name'])}"
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.cycles")
+        self._totals: dict[str, Any] = {
+            "cycles": 0,
+            "runtime": 0.0,
+            "errors": 0,
+            "programs": {},
+        }
+        # Hour start (ISO) -> cycles, runtime, errors, durations, programs
+        self._pending: dict[str, dict[str, Any]] = {}
+        self._cycle_start: float | None = None
+        self._cycle_program: str | None = None
+        # Time up to which the runtime of the cycle has been credited
+        self._runtime_until: float | None = None
+        self._error = False
+
+    async def async_load(self) -> None:
+        """Restore the totals, the hours not imported yet and the cycle."""
+        if stored := await self._store.async_load():
+            self._totals = stored["totals"]
+            self._pending = stored["pending"]
+            cycle = stored.get("cycle", {})
+            self._cycle_start = cycle.get("start")
+            self._cycle_program = cycle.get("program")
+            self._runtime_until = cycle.get("runtime_until")
+            self._error = cycle.get("error", False)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the data to store."""
+        return {
+            "totals": self._totals,
+            "pending": self._pending,
+            "cycle": {
+                "start": self._cycle_start,
+                "program": self._cycle_program,
+                "runtime_until": self._runtime_until,
+                "error": self._error,
+            },
+        }
+
+    @callback
+    def async_start(self) -> CALLBACK_TYPE:
+        """Follow the coordinator updates and import closed hours hourly."""
+        unsub_update = self._coordinator.async_add_listener(self._async_handle_update)
+        unsub_timer = async_track_time_change(
+            self._hass, self._async_hourly, minute=0, second=30
+        )
+
+        @callback
+        def _async_stop() -> None:
+            unsub_update()
+            unsub_timer()
+
+        return _async_stop
+
+    def _bucket(self, timestamp: float) -> dict[str, Any]:
+        """Return the pending bucket of the hour containing the timestamp."""
+        return self._pending.setdefault(
+            _hour_start(timestamp).isoformat(),
+            {"cycles": 0, "runtime": 0.0, "errors": 0, "durations": [], "programs": {}},
+        )
+
+    @callback
+    def _async_handle_update(self) -> None:
+        """Detect cycle start, cycle end and new errors in the latest snapshot."""
+        if self._coordinator.replaying:
+            # Replayed snapshots are historical and must not reach the statistics
+            return
+        data = self._coordinator.json_data
+        timestamp = self._coordinator.last_payload_time
+        if not data or timestamp is None:
+            return
+        status = data.get(self._device_type, {})
+
+        changed = False
+        field, healthy = ERROR_FIELDS.get(self._device_type, (None, set()))
+        error = field in status and status[field] not in healthy
+        if error != self._error:
+            if error:
+                self._bucket(timestamp)["errors"] += 1
+            self._error = error
+            changed = True
+
+        running = is_running(self._device_type, status)
+        if self._cycle_start is not None and self._runtime_until is not None:
+            # Credit the time since the last update, running or just ended
+            self._bucket(timestamp)["runtime"] += max(
+                timestamp - self._runtime_until, 0.0
+            )
+            self._runtime_until = timestamp
+
+        if running and self._cycle_start is None:
+            self._cycle_start = timestamp
+            self._runtime_until = timestamp
+            self._cycle_program = status.get(PROGRAM_FIELDS.get(self._device_type))
+            changed = True
+        elif not running and self._cycle_start is not None:
+            duration = timestamp - self._cycle_start
+            bucket = self._bucket(timestamp)
+            bucket["cycles"] += 1
+            bucket["durations"].append(duration)
+            program = self._cycle_program or "unknown"
+            bucket["programs"][program] = bucket["programs"].get(program, 0) + 1
+            self._cycle_start = None
+            self._cycle_program = None
+            self._runtime_until = None
+            changed = True
+
+        if changed:
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    async def _async_hourly(self, now: datetime) -> None:
+        """Import the hours that have closed."""
+        await self.async_flush()
+
+    async def async_flush(self) -> None:
+        """Import the closed pending hours as one batch per statistic.
+
+        The current hour is only stored, it is imported once it closes.
+        """
+        current = _hour_start(self._coordinator.clock()).isoformat()
+        hours = sorted(hour for hour in self._pending if hour < current)
+        if not hours:
+            await self._store.async_save(self._data_to_save())
+            return
+
+        rows: dict[str, list[dict[str, Any]]] = {}
+        names: dict[str, tuple[str, str | None, bool]] = {}
+
+        def _add(suffix: str, name: str, unit: str | None, row: dict[str, Any]) -> None:
+            names[suffix] = (name, unit, "sum" in row)
+            rows.setdefault(suffix, []).append(row)
+
+        totals = self._totals
+        for hour in hours:
+            bucket = self._pending.pop(hour)
+            start = datetime.fromisoformat(hour)
+            totals["cycles"] += bucket["cycles"]
+            totals["runtime"] += bucket["runtime"]
+            totals["errors"] += bucket["errors"]
+            _add(
+                "cycles",
+                "Cycles",
+                None,
+                {"start": start, "state": bucket["cycles"], "sum": totals["cycles"]},
+            )
+            _add(
+                "runtime_hours",
+                "Runtime",
+                "h",
+                {
+                    "start": start,
+                    "state": bucket["runtime"] / 3600,
+                    "sum": totals["runtime"] / 3600,
+                },
+            )
+            _add(
+                "errors",
+                "Errors",
+                None,
+                {"start": start, "state": bucket["errors"], "sum": totals["errors"]},
+            )
+            if durations := bucket["durations"]:
+                minutes = [duration / 60 for duration in durations]
+                _add(
+                    "average_cycle_duration",
+                    "Average cycle duration",
+                    "min",
+                    {
+                        "start": start,
+                        "mean": sum(minutes) / len(minutes),
+                        "min": min(minutes),
+                        "max": max(minutes),
+                    },
+                )
+            for program, count in bucket["programs"].items():
+                totals["programs"][program] = totals["programs"].get(program, 0) + count
+                _add(
+                    f"cycles_{slugify(program)}",
+                    f"Cycles {program}",
+                    None,
+                    {
+                        "start": start,
+                        "state": count,
+                        "sum": totals["programs"][program],
+                    },
+                )
+
+        for suffix, (name, unit, has_sum) in names.items():
+            metadata = {
+                "has_mean": not has_sum,
+                "has_sum": has_sum,
+                "name": f"{self._name} {name}",
+                "source": DOMAIN,
+                "statistic_id": f"{self._prefix}_{suffix}",
+                "unit_of_measurement": unit,
+            }
+            async_add_external_statistics(self._hass, metadata, rows[suffix])
+
+        await self._store.async_save(self._data_to_save())
+        _LOGGER.debug(
+            f"Imported {len(hours)} hours of cycle statistics for {self._name}"
+        )
@@ -0,0 +1,112 @@
+"""Logging helpers for candy_bianca integration.
+
+Messages use %-style arguments so nothing is formatted unless the record is
+emitted. This module must not import homeassistant, the benchmark in
+benchmarks/ loads it on its own.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Callable, Hashable, Mapping
+from typing import Any
+
+# Seconds during which a repeated warning for the same key is suppressed
+REPEAT_INTERVAL = 3600
+
+REDACTED = "**REDACTED**"
+REDACT_KEYS = {"key"}
+
+_trace = {"enabled": False, "level": None}
+
+
+def redact(data: Mapping[str, Any]) -> dict[str, Any]:
+    """Return a copy of entry data that is safe to log."""
+    return {k: REDACTED if k in REDACT_KEYS and v else v for k, v in data.items()}
+
+
+def trace_enabled() -> bool:
+    """Return True if trace logging is switched on."""
+    return _trace["enabled"]
+
+
+def set_trace(enabled: bool, logger_name: str = __package__ or __name__) -> None:
+    """Switch trace logging on or off at runtime.
+
+    Turning it on also lowers the integration logger to DEBUG, turning it
+    off restores the previous level.
+    """
+    logger = logging.getLogger(logger_name)
+    if enabled and not _trace["enabled"]:
+        _trace["level"] = logger.level
+        logger.setLevel(logging.DEBUG)
+    elif not enabled and _trace["enabled"]:
+        logger.setLevel(_trace["level"] or logging.NOTSET)
+    _trace["enabled"] = enabled
+
+
+class DeviceLogger:
+    """Logger for one device with lazy formatting and repeat suppression.
+
+    warning() and error() take a key identifying the condition. The first
+    occurrence is logged, repeats within the interval are only counted and
+    the count is reported with the next message that gets through.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        device: str,
+        interval: float = REPEAT_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize the logger."""
+        self._logger = logger
+        self._device = device
+        self._interval = interval
+        self._clock = clock
+        # key -> [time last logged, repeats suppressed since]
+        self._seen: dict[Hashable, list] = {}
+
+    def debug(self, msg: str, *args: Any) -> None:
+        """Log a debug message."""
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug("%s: " + msg, self._device, *args)
+
+    def trace(self, msg: str, *args: Any) -> None:
+        """Log a debug message only while trace logging is on."""
+        if _trace["enabled"]:
+            self.debug(msg, *args)
+
+    def warning(self, key: Hashable, msg: str, *args: Any) -> None:
+        """Log a warning unless the same key was logged recently."""
+        self._log_limited(logging.WARNING, key, msg, args)
+
+    def error(self, key: Hashable, msg: str, *args: Any) -> None:
+        """Log an error unless the same key was logged recently."""
+        self._log_limited(logging.ERROR, key, msg, args)
+
+    def clear(self, key: Hashable) -> None:
+        """Forget a condition so its next occurrence is logged right away."""
+        self._seen.pop(key, None)
+
+    def _log_limited(
+        self, level: int, key: Hashable, msg: str, args: tuple[Any, ...]
+    ) -> None:
+        """Log or count a rate limited message."""
+        if not self._logger.isEnabledFor(level):
+            return
+
+        now = self._clock()
+        seen = self._seen.get(key)
+        if seen is not None and now - seen[0] < self._interval:
+            seen[1] += 1
+            return
+
+        suppressed = seen[1] if seen is not None else 0
+        self._seen[key] = [now, 0]
+        if suppressed:
+            msg += " (repeated %d times)"
+            args = (*args, suppressed)
+        self._logger.log(level, "%s: " + msg, self._device, *args)
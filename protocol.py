@@ -0,0 +1,571 @@
+"""Candy Bianca appliance protocol, usable without Home Assistant.
+
+This module must not import homeassistant: it is shared by the integration
+and by the command line tool in cli.py.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import binascii
+import functools
+import itertools
+import json
+import logging
+import math
+from collections import Counter
+from concurrent.futures import Executor
+from typing import Any
+
+import requests
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 10
+
+DEVICE_TYPES = ("statusDWash", "statusLavatrice")
+
+# Fields reported in http-read.json
+STATUS_FIELDS = {
+    "statusDWash": (
+        "StatoWiFi",
+        "CodiceErrore",
+        "MetaCarico",
+        "StartStop",
+        "TreinUno",
+        "Eco",
+        "Program",
+        "ExtraDry",
+        "OpenDoorOpt",
+        "DelayStart",
+        "RemTime",
+        "MissSalt",
+        "MissRinse",
+        "OpenDoor",
+        "Reset",
+        "CheckUp",
+        "StatoDWash",
+    ),
+    "statusLavatrice": (
+        "StatoLavatrice",
+        "WiFiStatus",
+        "Err",
+        "MachMd",
+        "Pr",
+        "PrPh",
+        "PrCode",
+        "SLevel",
+        "Temp",
+        "SpinSp",
+        "Opt1",
+        "Opt2",
+        "Opt3",
+        "Opt4",
+        "Opt5",
+        "Opt6",
+        "Opt7",
+        "Opt8",
+        "Opt9",
+        "Steam",
+        "DryT",
+        "DelVal",
+        "RemTime",
+        "RecipeId",
+        "Lang",
+        "FillR",
+        "DisTestOn",
+        "DisTestRes",
+        "CheckUpState",
+    ),
+}
+
+
+class PayloadError(ValueError):
+    """Raised when a response of the appliance cannot be decoded."""
+
+
+_ON_OFF = {"0": "Disabled", "1": "Enabled"}
+_REMOTE_CONTROL = {"0": "No Remote Control", "1": "Remote Control"}
+
+# Raw value -> display value, unknown raw values are passed through
+TRANSLATIONS: dict[str, dict[str, dict[str, str]]] = {
+    "statusDWash": {
+        "StatoDWash": {
+            "0": "IDLE",
+            "1": "PRE_WASH",
+            "2": "WASH",
+            "3": "RINSE",
+            "4": "DRYING",
+            "5": "FINISHED",
+        },
+        "MissSalt": {"0": "Salt OK", "1": "Salt Missing"},
+        "MissRinse": {"0": "Rinse OK", "1": "Rinse Missing"},
+        "TreinUno": _ON_OFF,
+        "Eco": _ON_OFF,
+        "ExtraDry": _ON_OFF,
+        "OpenDoor": {"0": "Closed", "1": "Open"},
+        "MetaCarico": {"0": "Full Load", "1": "Half Load"},
+        "Program": {
+            "P19": "Zoom 39mins 60°C",
+            "P2": "P1 75°C",
+            "P5": "Universal 60°C",
+            "P8": "ECO 45°C",
+            "P12": "PreWash 5mins",
+        },
+    },
+    "statusLavatrice": {
+        "MachMd": {
+            "1": "Idle",
+            "2": "Running",
+            "3": "Paused",
+            "4": "Delayed Start Selection",
+            "5": "Delayed Start Programmed",
+            "6": "Error",
+            "7": "Finished1",
+            "8": "Finished2",
+        },
+        "PrPh": {
+            "0": "Stopped",
+            "1": "Prewash",
+            "2": "Wash",
+            "3": "Rinse",
+            "4": "Last Rinse",
+            "5": "End",
+            "6": "Drying",
+            "7": "Error",
+            "8": "Steam",
+            "9": "Good Night",
+            "10": "Spin",
+        },
+    },
+}
+
+
+def xor_bytes(data: bytes, key: bytes) -> bytes:
+    """XOR data with a repeating key."""
+    return bytes(byte ^ key[i % len(key)] for i, byte in enumerate(data))
+
+
+def encode_command(data: str, encrypted: bool, key: str) -> str | None:
+    """Encode the data using XOR encryption if enabled."""
+    if not encrypted:
+        return data
+
+    if not key:
+        _LOGGER.error("Key is empty")
+        return None
+
+    return binascii.hexlify(xor_bytes(data.encode(), key.encode())).decode()
+
+
+def decrypt_response(hex_data: str, encrypted: bool, key: str) -> str:
+    """Decrypt a response using XOR decryption if enabled.
+
+    Raises PayloadError if the response is not a hex string; the caller
+    decides how often that is worth logging.
+    """
+    if not encrypted or not key:
+        return hex_data
+
+    if len(hex_data) % 2 != 0:
+        raise PayloadError(f"Odd length hex string ({len(hex_data)} characters)")
+
+    try:
+        data_bytes = binascii.unhexlify(hex_data)
+    except (binascii.Error, ValueError) as xor_err:
+        raise PayloadError(f"XOR Decryption Error {xor_err}") from xor_err
+
+    return xor_bytes(data_bytes, key.encode()).decode("utf-8", errors="ignore")
+
+
+def decode_payload(hex_data: str, encrypted: bool, key: str) -> dict:
+    """Decode a raw http-read.json payload into its JSON document.
+
+    Raises PayloadError if it cannot be decrypted or is not a JSON object.
+    """
+    decrypted_data = decrypt_response(hex_data, encrypted, key)
+
+    try:
+        data = json.loads(decrypted_data)
+    except json.JSONDecodeError as err:
+        raise PayloadError(f"Invalid JSON response: {err}") from err
+    if not isinstance(data, dict):
+        raise PayloadError("Invalid JSON response: not an object")
+    return data
+
+
+_ALPHANUMERIC = b"0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def _char_weights() -> bytes:
+    """Return how typical each byte value is of a decrypted status response."""
+    sample = "".join(
+        f'{{"{device_type}":{{' + ",".join(f'"{field}":"0"' for field in fields) + "}}"
+        for device_type, fields in STATUS_FIELDS.items()
+    )
+    counts = Counter(sample.encode() + _ALPHANUMERIC + b" .-\r\n\t")
+    top = math.log(max(counts.values()) + 1)
+    return bytes(
+        1 + round(100 * math.log(counts[b] + 1) / top) if b in counts else 0
+        for b in range(256)
+    )
+
+
+_CHAR_WEIGHTS = _char_weights()
+# Key bytes are typed in by the user, so only printable ASCII is tried
+_KEY_BYTES = range(0x20, 0x7F)
+# For each key byte, tables mapping a ciphertext byte to the weight of the
+# byte it decrypts to and to whether that byte can appear at all, so a key
+# byte is scored over a whole column with bytes.translate()
+_WEIGHT_TABLES = {
+    k: bytes(_CHAR_WEIGHTS[b ^ k] for b in range(256)) for k in _KEY_BYTES
+}
+_VALID_TABLES = {
+    k: bytes(1 if _CHAR_WEIGHTS[b ^ k] else 0 for b in range(256)) for k in _KEY_BYTES
+}
+# Alternatives kept per key byte when repairing a decryption
+_KEY_CANDIDATES = 6
+
+
+def _json_error(plain: bytes) -> int | None:
+    """Return where a decrypted response stops being JSON, None if it is JSON."""
+    try:
+        document = json.loads(plain.decode("utf-8"))
+    except UnicodeDecodeError as err:
+        return err.start
+    except json.JSONDecodeError as err:
+        return err.pos
+    return None if isinstance(document, dict) else 0
+
+
+def _recover_key_length(
+    data: bytes, device_type: str, length: int, suffix: bytes
+) -> bytes | None:
+    """Return the key of the given length decrypting data, if there is one."""
+    prefix = f'{{"{device_type}":'.encode()
+    known: dict[int, int] = {}
+    for i, plain in itertools.chain(
+        enumerate(prefix),
+        zip(range(len(data) - len(suffix), len(data)), suffix),
+    ):
+        if i >= len(data):
+            continue
+        key_byte = data[i] ^ plain
+        if known.setdefault(i % length, key_byte) != key_byte:
+            return None
+
+    key = bytearray(length)
+    candidates: dict[int, list[int]] = {}
+    for j in range(length):
+        column = data[j::length]
+        if j in known:
+            if known[j] not in _KEY_BYTES or column.translate(
+                _VALID_TABLES[known[j]]
+            ).count(0):
+                return None
+            key[j] = known[j]
+            continue
+        valid = [
+            k for k in _KEY_BYTES if not column.translate(_VALID_TABLES[k]).count(0)
+        ]
+        if not valid:
+            return None
+        valid.sort(key=lambda k: sum(column.translate(_WEIGHT_TABLES[k])), reverse=True)
+        candidates[j] = valid[:_KEY_CANDIDATES]
+        key[j] = valid[0]
+
+    # Only bytes inside strings are left ambiguous by the column scores, fix
+    # the ones breaking the JSON structure starting from the first error
+    for _ in range(2 * len(candidates) + 1):
+        error = _json_error(xor_bytes(data, key))
+        if error is None:
+            return _refine_field_names(data, device_type, key, candidates)
+        best = None
+        for i in range(error, max(error - 4, -1), -1):
+            j = i % length
+            current = key[j]
+            for k in candidates.get(j, ()):
+                if k == current:
+                    continue
+                key[j] = k
+                new_error = _json_error(xor_bytes(data, key))
+                progress = len(data) + 1 if new_error is None else new_error
+                if progress > error and (best is None or progress > best[0]):
+                    best = (progress, j, k)
+            key[j] = current
+        if best is None:
+            return None
+        key[best[1]] = best[2]
+    return None
+
+
+def _known_fields(plain: bytes, device_type: str) -> int:
+    """Return how many field names of a decrypted response are known, -1 if invalid."""
+    try:
+        status = json.loads(plain.decode("utf-8"))[device_type]
+    except (ValueError, KeyError, TypeError):
+        return -1
+    if not isinstance(status, dict):
+        return -1
+    fields = STATUS_FIELDS.get(device_type, ())
+    return sum(1 for field in status if field in fields)
+
+
+def _refine_field_names(
+    data: bytes, device_type: str, key: bytearray, candidates: dict[int, list[int]]
+) -> bytes:
+    """Swap key bytes left ambiguous by the JSON when that fixes field names."""
+    best = _known_fields(xor_bytes(data, key), device_type)
+    for j, alternatives in candidates.items():
+        current = key[j]
+        for k in alternatives:
+            if k == current:
+                continue
+            key[j] = k
+            score = _known_fields(xor_bytes(data, key), device_type)
+            if score > best:
+                best = score
+                current = k
+        key[j] = current
+    return bytes(key)
+
+
+def recover_key(
+    hex_data: str,
+    device_types: tuple[str, ...] = DEVICE_TYPES,
+    max_key_length: int = 64,
+) -> str | None:
+    """Recover the XOR key from one encrypted http-read.json response.
+
+    Every response is a JSON document starting with {"<device type>":, and
+    most end with "}}. Key lengths are tried from the shortest up, first
+    assuming that ending and then without it, for responses with whitespace
+    after it. The known bytes fix part of the key and rule out most lengths,
+    the other key bytes are those decrypting their column to the most
+    typical response characters, and guesses that break the JSON are
+    repaired one by one.
+    A key byte only seen inside string values can remain ambiguous, so the
+    response should be several times longer than the key.
+    """
+    try:
+        data = binascii.unhexlify(hex_data.strip())
+    except (binascii.Error, ValueError):
+        return None
+
+    for suffix in (b'"}}', b""):
+        for length in range(1, min(max_key_length, len(data)) + 1):
+            for device_type in device_types:
+                if key := _recover_key_length(data, device_type, length, suffix):
+                    return key.decode()
+    return None
+
+
+def translate(device_type: str, field: str, value: Any) -> Any:
+    """Translate a raw status value to the value shown to the user."""
+    if device_type == "statusDWash":
+        if field == "StatoWiFi":
+            return _REMOTE_CONTROL.get(value, "Unknown")
+        if field == "CodiceErrore":
+            if value == "0" or value == "E0":
+                return "Healthy"
+            if value == "E2":
+                return "No Water Input"
+            return "Error"
+        if field == "RemTime":
+            try:
+                minutes = int(value)
+            except (ValueError, TypeError):
+                return "Error"
+            return f"{minutes // 60} hours {minutes % 60} minutes"
+
+    elif device_type == "statusLavatrice":
+        if field == "WiFiStatus":
+            return _REMOTE_CONTROL.get(value, "Unknown")
+        if field == "Err":
+            return "No errors" if value == "0" else "Error"
+        if value is None:
+            return None
+        if field == "Temp":
+            return value + "°C"
+        if field == "SpinSp":
+            return str(int(value) * 100) + " RPM"
+
+    return TRANSLATIONS.get(device_type, {}).get(field, {}).get(value, value)
+
+
+# Program name -> raw program, per device type
+PROGRAMS: dict[str, dict[str, str]] = {
+    "statusDWash": {
+        # The names shown by the Program sensor
+        **{name: raw for raw, name in TRANSLATIONS["statusDWash"]["Program"].items()},
+        "Intensive 75°C": "P2",
+        "Normal 60°C": "P5",
+        "Eco 45°C": "P8",
+        "Zoom 60°C": "P19",
+        "Pre-Wash": "P12",
+    },
+    "statusLavatrice": {
+        "Intensive 75°C": "P2",
+        "Normal 60°C": "P5",
+        "Eco 45°C": "P8",
+        "Zoom 60°C": "P19",
+        "Pre-Wash": "P12",
+    },
+}
+
+
+def untranslate_program(device_type: str, program: str) -> str | None:
+    """Return the raw program for a program name, or a raw program as is."""
+    programs = PROGRAMS.get(device_type, {})
+    if program in programs:
+        return programs[program]
+    if program in programs.values():
+        return program
+    return None
+
+
+def build_program_command(
+    raw_program: str,
+    eco: str = "0",
+    treinuno: str = "0",
+    extradry: str = "0",
+    startstop: str = "0",
+    metacarico: str = "0",
+) -> str:
+    """Return the command string starting or setting a program."""
+    return (
+        f"Program={raw_program}&Eco={eco}&TreinUno={treinuno}"
+        f"&ExtraDry={extradry}&StartStop={startstop}&MetaCarico={metacarico}"
+    )
+
+
+def translate_status(device_type: str, data: dict) -> dict[str, Any]:
+    """Translate every field of a decoded http-read.json document."""
+    status = data.get(device_type, {})
+    return {
+        field: translate(device_type, field, value) for field, value in status.items()
+    }
+
+
+class CandyBiancaClient:
+    """Blocking client for one appliance."""
+
+    def __init__(
+        self,
+        ip_address: str,
+        encrypted: bool = False,
+        key: str = "",
+        timeout: float = DEFAULT_TIMEOUT,
+        session: requests.Session | None = None,
+    ) -> None:
+        """Initialize the client."""
+        self.ip_address = ip_address
+        self.encrypted = encrypted
+        self.key = key
+        self.timeout = timeout
+        self._session = session or requests.Session()
+
+    @property
+    def read_url(self) -> str:
+        """Return the status URL of the appliance."""
+        return f"http://{self.ip_address}/http-read.json?encrypted={'1' if self.encrypted else '0'}"
+
+    def write_url(self, encoded_data: str) -> str:
+        """Return the URL sending already encoded data to the appliance."""
+        return (
+            f"http://{self.ip_address}/http-write.json?encrypted=1&data={encoded_data}"
+        )
+
+    def get(self, url: str) -> requests.Response:
+        """Send a GET request to the appliance."""
+        return self._session.get(url, timeout=self.timeout)
+
+    def fetch(self) -> requests.Response:
+        """Fetch the raw status response."""
+        return self.get(self.read_url)
+
+    def read(self) -> dict:
+        """Fetch and decode the status of the appliance.
+
+        Raises PayloadError if the response cannot be decoded.
+        """
+        response = self.fetch()
+        response.raise_for_status()
+        return decode_payload(response.text.strip(), self.encrypted, self.key)
+
+    def write(self, data: str) -> str | None:
+        """Send a command string such as "Program=P5&Eco=0" to the appliance."""
+        encoded_data = encode_command(data, self.encrypted, self.key)
+        if encoded_data is None:
+            return None
+        response = self.get(self.write_url(encoded_data))
+        response.raise_for_status()
+        if not response.text:
+            return ""
+        return decrypt_response(response.text, self.encrypted, self.key)
+
+    def send_program(
+        self, device_type: str, program: str, **options: str
+    ) -> str | None:
+        """Send a program by name, with the options of build_program_command.
+
+        Raises ValueError if the program is not known for the device type.
+        """
+        raw_program = untranslate_program(device_type, program)
+        if raw_program is None:
+            raise ValueError(f"Unknown program for {device_type}: {program}")
+        return self.write(build_program_command(raw_program, **options))
+
+    def close(self) -> None:
+        """Close the underlying HTTP session."""
+        self._session.close()
+
+
+class AsyncCandyBiancaClient:
+    """Asyncio client for one appliance.
+
+    The requests are made by a CandyBiancaClient in an executor, which keeps
+    the HTTP handling identical to the blocking client.
+    """
+
+    def __init__(
+        self,
+        ip_address: str,
+        encrypted: bool = False,
+        key: str = "",
+        timeout: float = DEFAULT_TIMEOUT,
+        executor: Executor | None = None,
+    ) -> None:
+        """Initialize the client."""
+        self.client = CandyBiancaClient(ip_address, encrypted, key, timeout)
+        self._executor = executor
+
+    async def _run(self, func, *args):
+        """Run a blocking client method in the executor."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    async def fetch(self) -> requests.Response:
+        """Fetch the raw status response."""
+        return await self._run(self.client.fetch)
+
+    async def read(self) -> dict:
+        """Fetch and decode the status of the appliance."""
+        return await self._run(self.client.read)
+
+    async def write(self, data: str) -> str | None:
+        """Send a command string to the appliance."""
+        return await self._run(self.client.write, data)
+
+    async def send_program(
+        self, device_type: str, program: str, **options: str
+    ) -> str | None:
+        """Send a program by name to the appliance."""
+        return await self._run(
+            functools.partial(self.client.send_program, device_type, program, **options)
+        )
+
+    def close(self) -> None:
+        """Close the underlying HTTP session."""
+        self.client.close()
@@ -0,0 +1,158 @@
+"""Record and replay of raw appliance responses for candy_bianca."""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import json
+import logging
+import os
+from collections.abc import Callable, Iterator
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .coordinator import CandyBiancaCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_TRACE_BYTES = 16 * 1024 * 1024
+
+
+def make_record(timestamp: float, latency: float, status: int, payload: str) -> dict:
+    """Build a trace record for one raw response."""
+    return {
+        "t": round(timestamp, 3),
+        "l": round(latency, 4),
+        "s": status,
+        "p": payload,
+    }
+
+
+def _is_record(record: object) -> bool:
+    """Return True if a decoded line has the fields of a trace record."""
+    return (
+        isinstance(record, dict)
+        and isinstance(record.get("t"), (int, float))
+        and isinstance(record.get("s"), int)
+        and isinstance(record.get("p"), str)
+    )
+
+
+def read_trace(path: str) -> Iterator[dict]:
+    """Yield the records of a trace file in the order they were recorded.
+
+    Raises ValueError on a line that is not a trace record.
+    """
+    with open(path, encoding="utf-8") as trace:
+        for number, line in enumerate(trace, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if not _is_record(record):
+                raise ValueError(f"Malformed trace record on line {number}")
+            yield record
+
+
+class TraceRecorder:
+    """Append raw responses to a trace file, one compact JSON record per line.
+
+    Once the file reaches max_bytes it is renamed to <path>.1, replacing the
+    previous one, and a new file is started, so a trace never takes more
+    than twice max_bytes. Appending does blocking file I/O and must run in
+    the executor.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_TRACE_BYTES) -> None:
+        """Initialize the recorder."""
+        self.path = path
+        self._max_bytes = max_bytes
+
+    def append(self, record: dict) -> None:
+        """Append a single record to the trace file."""
+        try:
+            if os.path.getsize(self.path) >= self._max_bytes:
+                os.replace(self.path, self.path + ".1")
+        except FileNotFoundError:
+            pass
+        with open(self.path, "a", encoding="utf-8") as trace:
+            trace.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+class VirtualClock:
+    """Clock that only moves when a replayed record says so."""
+
+    def __init__(self, start: float = 0.0) -> None:
+        """Initialize the clock."""
+        self._now = start
+
+    def time(self) -> float:
+        """Return the current virtual time."""
+        return self._now
+
+    def advance_to(self, timestamp: float) -> None:
+        """Move the clock forward to the given time; it never goes back."""
+        if timestamp > self._now:
+            self._now = timestamp
+
+
+async def async_replay_trace(
+    coordinator: CandyBiancaCoordinator,
+    path: str,
+    clock: VirtualClock | None = None,
+    on_record: Callable[[dict], None] | None = None,
+) -> int:
+    """Feed a recorded trace through a coordinator and its listeners.
+
+    Records are decoded exactly as live responses are and pushed to the
+    listeners with their recorded timestamps, without waiting between them,
+    so a full wash cycle replays as fast as the listeners can process it.
+    The event loop gets a turn after every record. Use a coordinator whose
+    entities are not added to Home Assistant, as ReplayDriver does:
+    replayed states written by live entities would reach the recorder and
+    automations as new state changes. The coordinator is flagged as replaying so the cycle statistics and the
+    archive ignore the historical snapshots, and the live snapshot is put
+    back afterwards. on_record is called after each record has reached the
+    listeners. Returns the number of records replayed.
+    """
+    records = await coordinator.hass.async_add_executor_job(
+        lambda: list(read_trace(path))
+    )
+    if not records:
+        return 0
+
+    if clock is None:
+        clock = VirtualClock(records[0]["t"])
+
+    live = (
+        coordinator.data,
+        coordinator.json_data,
+        coordinator.last_payload_time,
+        copy.deepcopy(coordinator.countdown),
+    )
+    wall_clock = coordinator.clock
+    coordinator.clock = clock.time
+    coordinator.replaying = True
+    try:
+        for record in records:
+            clock.advance_to(record["t"])
+            data = None
+            if record["s"] == 200:
+                data = coordinator.process_payload(record["p"], clock.time())
+            coordinator.async_set_updated_data(data)
+            if on_record is not None:
+                on_record(record)
+            await asyncio.sleep(0)
+    finally:
+        coordinator.clock = wall_clock
+        coordinator.replaying = False
+        (
+            live_data,
+            coordinator.json_data,
+            coordinator.last_payload_time,
+            coordinator.countdown,
+        ) = live
+        coordinator.async_set_updated_data(live_data)
+
+    _LOGGER.info(f"Replayed {len(records)} records from {path} on {coordinator.name}")
+    return len(records)
@@ -0,0 +1,75 @@
+"""Replay a recorded trace through a coordinator and sensors built for it."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.sensor import SensorEntity
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.typing import StateType
+
+from .coordinator import CandyBiancaCoordinator
+from .replay import async_replay_trace
+from .sensor import CandyBiancaSensor, build_sensors
+
+
+class ReplayEntry:
+    """Stand-in for the config entry of a device that only exists in a trace."""
+
+    def __init__(self, entry_id: str, data: dict[str, Any]) -> None:
+        """Initialize the entry."""
+        self.entry_id = entry_id
+        self.data = data
+        self.options: dict[str, Any] = {}
+        self.title = data["name"]
+
+
+class ReplayDriver:
+    """Coordinator and sensors of a device, driven by a recorded trace.
+
+    Nothing is registered with Home Assistant and no request reaches an
+    appliance: the sensors are built as the platform builds them but never
+    added, and the coordinator is never polled. Replaying a trace returns
+    the state of every sensor after each record, so a trace of a real cycle
+    can be compared against the expected states in tests and scripts.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, data: dict[str, Any], entry_id: str = "replay"
+    ) -> None:
+        """Initialize the driver from the data of a config entry."""
+        self.entry = ReplayEntry(
+            entry_id,
+            {
+                "name": "Replay",
+                "ip_address": "0.0.0.0",
+                "encrypted": False,
+                "key": "",
+                **data,
+                # A replay must not write to a trace or an archive
+                "trace_file": None,
+                "archive": False,
+            },
+        )
+        self.coordinator = CandyBiancaCoordinator(hass, self.entry)
+        self.coordinator.update_interval = None
+        self.sensors: list[SensorEntity] = build_sensors(
+            hass, self.entry, self.coordinator
+        )
+        for sensor in self.sensors:
+            if isinstance(sensor, CandyBiancaSensor):
+                self.coordinator.async_add_listener(sensor._update_state)
+
+    def states(self) -> dict[str, StateType]:
+        """Return the current state of every sensor by name."""
+        return {sensor.name: sensor.native_value for sensor in self.sensors}
+
+    async def async_replay(self, path: str) -> list[tuple[float, dict[str, StateType]]]:
+        """Replay a trace file and return the sensor states after each record."""
+        snapshots: list[tuple[float, dict[str, StateType]]] = []
+        await async_replay_trace(
+            self.coordinator,
+            path,
+            on_record=lambda record: snapshots.append((record["t"], self.states())),
+        )
+        return snapshots
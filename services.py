@@ -2,19 +2,66 @@
 
 from __future__ import annotations
 
-import logging
 import json
-import binascii
+import logging
 import requests
-
-from homeassistant.core import HomeAssistant, ServiceCall
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
 from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
 
 from .const import DOMAIN
+from .log_util import set_trace
+from .protocol import (
+    PayloadError,
+    build_program_command,
+    decrypt_response,
+    encode_command,
+    untranslate_program,
+)
+from .replay_driver import ReplayDriver
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def _as_timestamp(value: Any, default: float) -> float:
+    """Convert a service time to a UNIX timestamp.
+
+    Times without a time zone are in the time zone of Home Assistant.
+    """
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        parsed = dt_util.parse_datetime(value)
+        if parsed is None:
+            raise ValueError(f"not a date and time: {value}")
+        value = parsed
+    return dt_util.as_utc(value).timestamp()
+
+
+def _json_state(value: Any) -> Any:
+    """Return a sensor state as a JSON value."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _write_json_lines(path: str, rows: list[dict]) -> None:
+    """Write rows to a JSON lines file."""
+    with open(path, "w", encoding="utf-8") as output:
+        for row in rows:
+            output.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
 async def async_setup_services(hass: HomeAssistant) -> None:
     """Set up the services for the integration."""
 
@@ -50,37 +97,43 @@ async def async_setup_services(hass: HomeAssistant) -> None:
         device_type = coordinator._device_type
 
         _LOGGER.debug(
-            f"Coordinator data: IP Address: {ip_address}, Encrypted: {encrypted}, Key: {key}, Device Type: {device_type}"
+            f"Coordinator data: IP Address: {ip_address}, Encrypted: {encrypted}, Device Type: {device_type}"
         )
 
-        raw_program = await _untranslate_program(program, device_type, coordinator)
+        raw_program = untranslate_program(device_type, program)
+        _LOGGER.debug(f"Raw program: {raw_program}")
         if not raw_program:
             raise HomeAssistantError(f"Could not untranslate program value: {program}")
 
-        # Construct the data string
-        data_to_encode = f"Program={raw_program}&Eco={eco}&TreinUno={treinuno}&ExtraDry={extradry}&StartStop={startstop}&MetaCarico={metacarico}"
+        data_to_encode = build_program_command(
+            raw_program, eco, treinuno, extradry, startstop, metacarico
+        )
         _LOGGER.debug(f"Data to encode: {data_to_encode}")
 
-        encoded_data = await _encode_data(data_to_encode, encrypted, key)
+        encoded_data = encode_command(data_to_encode, encrypted, key)
         if not encoded_data:
             raise HomeAssistantError(f"Could not encode data: {data_to_encode}")
 
         try:
-            url = f"http://{ip_address}/http-write.json?encrypted=1&data={encoded_data}"
+            url = coordinator.client.write_url(encoded_data)
             _LOGGER.debug(f"Sending url: {url}")
 
-            response = await hass.async_add_executor_job(requests.get, url)
+            response = await coordinator.async_write(url)
             response.raise_for_status()
             _LOGGER.debug(f"Response status: {response.status_code}")
 
             # Decrypt the response
             if response.text:
-                decrypted_response = await _decrypt_data(
-                    response.text, encrypted, coordinator._key
-                )
-                _LOGGER.debug(
-                    f"Decrypted response from appliance: {decrypted_response}"
-                )
+                try:
+                    decrypted_response = decrypt_response(
+                        response.text, encrypted, coordinator._key
+                    )
+                except PayloadError as e:
+                    _LOGGER.debug(f"Could not decrypt response from appliance: {e}")
+                else:
+                    _LOGGER.debug(
+                        f"Decrypted response from appliance: {decrypted_response}"
+                    )
             else:
                 _LOGGER.debug("Appliance response is empty")
 
@@ -198,90 +251,128 @@ async def async_setup_services(hass: HomeAssistant) -> None:
     )
     _LOGGER.debug(f"Service send_program registered")
 
-    async def _untranslate_program(
-        program: str, device_type: str, coordinator
-    ) -> str | None:
-        """Untranslate the program value to its raw value."""
-        _LOGGER.debug(f"Untranslating program: {program}")
-
-        if device_type == "statusDWash":
-            program_mapping = {
-                "Zoom 39mins 60°C": "P19",
-                "Intensive 75°C": "P2",
-                "Universal 60°C": "P5",
-                "PreWash 5mins": "P12",
-                "Eco 45°C": "P8",
-            }
-        elif device_type == "statusLavatrice":
-            program_mapping = {
-                "Intensive 75°C": "P2",
-                "Normal 60°C": "P5",
-                "Eco 45°C": "P8",
-                "Zoom 60°C": "P19",
-                "Pre-Wash": "P12",
-            }
-        else:
-            program_mapping = {}
+    async def async_replay_trace_service(service: ServiceCall) -> ServiceResponse:
+        """Replay a recorded trace file through a detached copy of a device's sensors.
 
-        raw_program = program_mapping.get(program)
-        _LOGGER.debug(f"Raw program: {raw_program}")
-        return raw_program
+        The live entities are left alone; the replayed states are returned
+        and, if output is given, written to a JSON lines file.
+        """
+        _LOGGER.debug(f"Calling async_replay_trace: {service.data}")
 
-    async def _encode_data(data: str, encrypted: bool, key: str) -> str | None:
-        """Encode the data using XOR encryption if enabled."""
-        _LOGGER.debug(f"Encoding data: {data}, encrypted: {encrypted}")
+        device_name = service.data.get("device_name")
+        path = service.data.get("path")
+        output = service.data.get("output")
 
-        if not encrypted:
-            _LOGGER.debug(f"Not encrypted")
-            return data
+        if not device_name:
+            raise HomeAssistantError("device_name is required")
+        if not path:
+            raise HomeAssistantError("path is required")
 
-        if not key:
-            _LOGGER.error(f"Key is empty")
-            return None
+        coordinator = None
+        for coord in hass.data[DOMAIN].values():
+            if coord._entry.data["name"] == device_name:
+                coordinator = coord
+                break
 
+        if not coordinator:
+            raise HomeAssistantError(f"Could not find device with name: {device_name}")
+        for allowed in (path, output):
+            if allowed and not hass.config.is_allowed_path(allowed):
+                raise HomeAssistantError(f"Path is not allowed: {allowed}")
+
+        driver = ReplayDriver(
+            hass,
+            dict(coordinator._entry.data),
+            entry_id=f"{coordinator._entry.entry_id}-replay",
+        )
         try:
-            key_bytes = key.encode()
-            data_bytes = data.encode()
-            encoded_data_bytes = bytearray()
-
-            for i, byte in enumerate(data_bytes):
-                encoded_data_bytes.append(byte ^ key_bytes[i % len(key_bytes)])
+            snapshots = await driver.async_replay(path)
+        except (OSError, ValueError) as e:
+            raise HomeAssistantError(f"Could not replay trace {path}: {e}")
 
-            encoded_data = binascii.hexlify(encoded_data_bytes).decode()
-            _LOGGER.debug(f"Encoded data: {encoded_data}")
-            return encoded_data
-        except Exception as e:
-            _LOGGER.error(f"Encoding error: {e}")
+        rows = [
+            {
+                "t": timestamp,
+                "states": {name: _json_state(value) for name, value in states.items()},
+            }
+            for timestamp, states in snapshots
+        ]
+        if output:
+            try:
+                await hass.async_add_executor_job(_write_json_lines, output, rows)
+            except OSError as e:
+                raise HomeAssistantError(f"Could not write {output}: {e}")
+        _LOGGER.info(f"Replayed {len(rows)} records of {device_name} from {path}")
+
+        if not service.return_response:
             return None
+        return {"records": len(rows), "snapshots": rows}
 
-    async def _decrypt_data(
-        self, hex_data: str, encrypted: bool, key: str
-    ) -> str | None:
-        """Decrypt the data using XOR decryption if enabled."""
-        _LOGGER.debug(f"Decoding data: {hex_data}, encrypted: {encrypted}")
+    hass.services.async_register(
+        DOMAIN,
+        "replay_trace",
+        async_replay_trace_service,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    _LOGGER.debug(f"Service replay_trace registered")
 
-        if not encrypted:
-            _LOGGER.debug(f"Not encrypted")
-            return hex_data
+    async def async_export_archive(service: ServiceCall) -> None:
+        """Export the archived payloads of a time range to a file."""
+        _LOGGER.debug(f"Calling async_export_archive: {service.data}")
 
-        if not key:
-            _LOGGER.error(f"Key is empty")
-            return None
+        device_name = service.data.get("device_name")
+        path = service.data.get("path")
+
+        if not device_name:
+            raise HomeAssistantError("device_name is required")
+        if not path:
+            raise HomeAssistantError("path is required")
+
+        coordinator = None
+        for coord in hass.data[DOMAIN].values():
+            if coord._entry.data["name"] == device_name:
+                coordinator = coord
+                break
+
+        if not coordinator:
+            raise HomeAssistantError(f"Could not find device with name: {device_name}")
+        if coordinator.archive is None:
+            raise HomeAssistantError(f"Archive is not enabled for: {device_name}")
+
+        if not hass.config.is_allowed_path(path):
+            raise HomeAssistantError(f"Path is not allowed: {path}")
 
         try:
-            key_bytes = key.encode()
-            if len(hex_data) % 2 != 0:
-                _LOGGER.error(f"Odd length hex string before xor: {hex_data}")
-                return None
-            data_bytes = binascii.unhexlify(hex_data)
-            decrypted_data_bytes = bytearray()
-
-            for i, byte in enumerate(data_bytes):
-                decrypted_data_bytes.append(byte ^ key_bytes[i % len(key_bytes)])
-
-            decrypted_data = decrypted_data_bytes.decode("utf-8", errors="ignore")
-            _LOGGER.debug(f"Decoded data: {decrypted_data}")
-            return decrypted_data
-        except Exception as e:
-            _LOGGER.error(f"Decoding error: {e}")
-            return None
+            start = _as_timestamp(service.data.get("start"), 0.0)
+            end = _as_timestamp(service.data.get("end"), dt_util.utcnow().timestamp())
+        except (TypeError, ValueError) as e:
+            raise HomeAssistantError(f"Invalid time range: {e}")
+
+        await coordinator.async_flush_archive()
+        try:
+            count = await hass.async_add_executor_job(
+                coordinator.archive.export_range, start, end, path
+            )
+        except OSError as e:
+            raise HomeAssistantError(f"Could not export archive to {path}: {e}")
+        _LOGGER.info(f"Exported {count} archived payloads of {device_name} to {path}")
+
+    hass.services.async_register(
+        DOMAIN,
+        "export_archive",
+        async_export_archive,
+    )
+    _LOGGER.debug(f"Service export_archive registered")
+
+    async def async_set_trace(service: ServiceCall) -> None:
+        """Switch trace logging on or off."""
+        enabled = bool(service.data.get("enabled", True))
+        set_trace(enabled)
+        _LOGGER.info("Trace logging %s", "enabled" if enabled else "disabled")
+
+    hass.services.async_register(
+        DOMAIN,
+        "set_trace",
+        async_set_trace,
+    )
+    _LOGGER.debug(f"Service set_trace registered")
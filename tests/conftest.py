@@ -0,0 +1,43 @@
+"""Test setup for the candy_bianca integration.
+
+The modules without Home Assistant imports are tested on their own, so they
+are loaded as top level modules from the repository root. Tests that need
+Home Assistant use the integration fixture and are skipped without it.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import pathlib
+import sys
+from types import ModuleType
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+FIXTURES = pathlib.Path(__file__).resolve().parent / "fixtures"
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def trace_path() -> str:
+    """Return the path of a recorded dishwasher cycle."""
+    return str(FIXTURES / "dishwasher_cycle.jsonl")
+
+
+@pytest.fixture
+def integration() -> ModuleType:
+    """Import the integration as the candy_bianca package."""
+    pytest.importorskip("homeassistant")
+    if "candy_bianca" not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            "candy_bianca",
+            ROOT / "__init__.py",
+            submodule_search_locations=[str(ROOT)],
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["candy_bianca"] = module
+        spec.loader.exec_module(module)
+    return sys.modules["candy_bianca"]
@@ -0,0 +1,163 @@
+"""Tests for the per-device request arbiter."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from arbiter import RequestArbiter
+
+
+def _job(order: list[str], name: str, gate: asyncio.Event | None = None):
+    """Return a request that logs its name, after the gate opens if given."""
+
+    async def job() -> str:
+        if gate is not None:
+            await gate.wait()
+        order.append(name)
+        return name
+
+    return job
+
+
+async def _settle() -> None:
+    """Let the queued tasks run up to their next wait."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_writes_run_before_waiting_polls():
+    """A write overtakes the waiting polls, which it makes redundant."""
+
+    async def scenario():
+        arbiter = RequestArbiter()
+        order: list[str] = []
+        gate = asyncio.Event()
+        busy = asyncio.create_task(arbiter.async_poll(_job(order, "busy", gate)))
+        await _settle()
+        poll = asyncio.create_task(arbiter.async_poll(_job(order, "poll")))
+        await _settle()
+        first = asyncio.create_task(arbiter.async_write(_job(order, "write 1")))
+        second = asyncio.create_task(arbiter.async_write(_job(order, "write 2")))
+        await _settle()
+        assert arbiter.queue_depth == 3
+
+        gate.set()
+        results = await asyncio.gather(busy, poll, first, second)
+        assert order == ["busy", "write 1", "write 2"]
+        assert results == ["busy", None, "write 1", "write 2"]
+        assert arbiter.dropped_polls == 1
+        assert arbiter.metrics["in_flight"] is False
+
+    asyncio.run(scenario())
+
+
+def test_poll_dropped_while_write_queued():
+    """A poll started while a write is queued returns None at once."""
+
+    async def scenario():
+        arbiter = RequestArbiter()
+        order: list[str] = []
+        gate = asyncio.Event()
+        write = asyncio.create_task(arbiter.async_write(_job(order, "write", gate)))
+        await _settle()
+        assert await arbiter.async_poll(_job(order, "poll")) is None
+        gate.set()
+        await write
+        assert order == ["write"]
+        assert arbiter.dropped_polls == 1
+
+    asyncio.run(scenario())
+
+
+def test_failed_write_keeps_waiting_polls():
+    """A write that raised does not make the waiting polls redundant."""
+
+    async def scenario():
+        arbiter = RequestArbiter()
+        order: list[str] = []
+        gate = asyncio.Event()
+
+        async def failing() -> None:
+            raise OSError("unreachable")
+
+        busy = asyncio.create_task(arbiter.async_poll(_job(order, "busy", gate)))
+        await _settle()
+        poll = asyncio.create_task(arbiter.async_poll(_job(order, "poll")))
+        await _settle()
+        write = asyncio.create_task(arbiter.async_write(failing))
+        await _settle()
+
+        gate.set()
+        with pytest.raises(OSError):
+            await write
+        assert await poll == "poll"
+        await busy
+        assert order == ["busy", "poll"]
+        assert arbiter.dropped_polls == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_block_the_queue():
+    """Cancelled waiters, before or after their turn, release the device."""
+
+    async def scenario():
+        arbiter = RequestArbiter()
+        order: list[str] = []
+        gate = asyncio.Event()
+        busy = asyncio.create_task(arbiter.async_poll(_job(order, "busy", gate)))
+        await _settle()
+        cancelled_poll = asyncio.create_task(arbiter.async_poll(_job(order, "gone")))
+        handed_over = asyncio.create_task(arbiter.async_write(_job(order, "late")))
+        await _settle()
+
+        cancelled_poll.cancel()
+        await _settle()
+        assert arbiter.queue_depth == 1
+
+        # Cancel the write as soon as the turn is handed to it
+        arbiter.async_add_listener(
+            lambda: arbiter.queue_depth == 0 and handed_over.cancel()
+        )
+        gate.set()
+        await busy
+        await asyncio.gather(cancelled_poll, handed_over, return_exceptions=True)
+        assert handed_over.cancelled()
+
+        assert await arbiter.async_poll(_job(order, "next")) == "next"
+        assert order == ["busy", "next"]
+        assert arbiter.queue_depth == 0
+        assert arbiter.metrics["in_flight"] is False
+
+    asyncio.run(scenario())
+
+
+def test_listeners_follow_the_queue():
+    """Listeners see requests queue up and drain."""
+
+    async def scenario():
+        arbiter = RequestArbiter()
+        seen: list[tuple[int, bool]] = []
+        remove = arbiter.async_add_listener(
+            lambda: seen.append((arbiter.queue_depth, arbiter.metrics["in_flight"]))
+        )
+        order: list[str] = []
+        gate = asyncio.Event()
+        busy = asyncio.create_task(arbiter.async_write(_job(order, "busy", gate)))
+        await _settle()
+        write = asyncio.create_task(arbiter.async_write(_job(order, "write")))
+        await _settle()
+        assert seen[-1] == (1, True)
+
+        gate.set()
+        await asyncio.gather(busy, write)
+        assert seen[-1] == (0, False)
+
+        remove()
+        count = len(seen)
+        await arbiter.async_poll(_job(order, "poll"))
+        assert len(seen) == count
+
+    asyncio.run(scenario())
@@ -0,0 +1,54 @@
+"""Tests for the polling command line tool."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from types import SimpleNamespace
+
+import cli
+
+
+class _FakeClient:
+    """Async client returning a fixed response body."""
+
+    def __init__(self, ip_address: str, body: str, status_code: int = 200) -> None:
+        self.client = SimpleNamespace(ip_address=ip_address, encrypted=False, key="")
+        self._body = body
+        self._status_code = status_code
+
+    async def fetch(self):
+        return SimpleNamespace(
+            ok=self._status_code < 400, status_code=self._status_code, text=self._body
+        )
+
+
+def test_poll_reports_errors_per_appliance(capsys):
+    """A response that fails to translate does not stop the other appliances."""
+    good = {"statusLavatrice": {"SpinSp": "12", "MachMd": "2"}}
+    bad = {"statusLavatrice": {"SpinSp": "", "MachMd": "2"}}
+    clients = [
+        _FakeClient("10.0.0.1", json.dumps(bad)),
+        _FakeClient("10.0.0.2", "[]"),
+        _FakeClient("10.0.0.3", json.dumps(good)),
+        _FakeClient("10.0.0.4", "Not Found", status_code=404),
+    ]
+    args = argparse.Namespace(translate=True, device_type=None)
+
+    async def scenario():
+        limiter = cli.RateLimiter(0)
+        semaphore = asyncio.Semaphore(4)
+        await asyncio.gather(
+            *(cli._poll_one(client, limiter, semaphore, args) for client in clients)
+        )
+
+    asyncio.run(scenario())
+    records = {
+        record["ip"]: record
+        for record in map(json.loads, capsys.readouterr().out.splitlines())
+    }
+    assert "untranslatable" in records["10.0.0.1"]["error"]
+    assert "undecodable" in records["10.0.0.2"]["error"]
+    assert records["10.0.0.4"]["error"] == "HTTP 404"
+    assert records["10.0.0.3"]["data"] == {"SpinSp": "1200 RPM", "MachMd": "Running"}
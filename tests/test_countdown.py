@@ -0,0 +1,63 @@
+"""Tests for the local remaining time countdown."""
+
+from __future__ import annotations
+
+from countdown import RemainingTimeEstimator, is_running, phase
+
+
+def _sync(estimator, remaining, minute, stato="2"):
+    """Resync a dishwasher snapshot taken at the given minute."""
+    status = {"StatoDWash": stato, "RemTime": str(remaining)}
+    estimator.resync(
+        remaining,
+        minute * 60.0,
+        is_running("statusDWash", status),
+        phase("statusDWash", status),
+    )
+
+
+def test_remaining_equals_reported_after_poll():
+    """The value right after a poll is the reported RemTime."""
+    estimator = RemainingTimeEstimator()
+    _sync(estimator, 120, 0)
+    assert estimator.remaining(0.0) == 120
+    assert estimator.remaining(5 * 60.0) == 115
+    _sync(estimator, 110, 10)
+    assert estimator.remaining(10 * 60.0) == 110
+
+
+def test_stall_then_normal_countdown():
+    """A stalled heating phase does not distort the next phase."""
+    estimator = RemainingTimeEstimator()
+    # Heating: RemTime stays at 130 for 20 minutes
+    for minute in (0, 10, 20):
+        _sync(estimator, 130, minute, stato="1")
+        assert estimator.remaining(minute * 60.0) == 130
+    assert estimator.rate < 1.0
+
+    # Washing: RemTime counts down in real minutes
+    for minute, reported in ((30, 119), (40, 109), (50, 99)):
+        _sync(estimator, reported, minute, stato="2")
+        assert estimator.remaining(minute * 60.0) == reported
+        # Halfway to the next poll the estimate tracks the appliance
+        assert abs(estimator.remaining((minute + 5) * 60.0) - (reported - 5)) <= 1
+    assert estimator.rate == 1.0
+
+
+def test_remaining_floored_at_zero():
+    """The countdown never goes below zero."""
+    estimator = RemainingTimeEstimator()
+    _sync(estimator, 3, 0)
+    assert estimator.remaining(10 * 60.0) == 0
+    assert estimator.end_time == 3 * 60.0
+
+
+def test_not_running_keeps_reported_value():
+    """A paused or idle appliance keeps showing the reported value."""
+    estimator = RemainingTimeEstimator()
+    _sync(estimator, 45, 0, stato="0")
+    assert estimator.end_time is None
+    assert estimator.remaining(30 * 60.0) == 45
+
+    estimator.resync(None, 60.0, False)
+    assert estimator.remaining(60.0) is None
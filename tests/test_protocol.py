@@ -0,0 +1,69 @@
+"""Tests for decoding and translating appliance responses."""
+
+from __future__ import annotations
+
+import binascii
+import json
+import logging
+
+import pytest
+
+from protocol import (
+    PayloadError,
+    build_program_command,
+    decode_payload,
+    translate,
+    untranslate_program,
+    xor_bytes,
+)
+
+KEY = "sEcReTkEy1"
+DOCUMENT = {"statusDWash": {"StatoDWash": "2", "RemTime": "95"}}
+
+
+def _encrypt(plain: str, key: str = KEY) -> str:
+    """Encrypt a document as the appliance does."""
+    return binascii.hexlify(xor_bytes(plain.encode(), key.encode())).decode()
+
+
+def test_decode_plain_and_encrypted():
+    """Plain and encrypted payloads decode to the same document."""
+    plain = json.dumps(DOCUMENT)
+    assert decode_payload(plain, False, "") == DOCUMENT
+    assert decode_payload(_encrypt(plain), True, KEY) == DOCUMENT
+
+
+@pytest.mark.parametrize(
+    ("payload", "encrypted"),
+    [
+        ("abc", True),
+        ("zz", True),
+        (_encrypt("not json"), True),
+        ("[1, 2]", False),
+    ],
+)
+def test_decode_errors_are_raised_not_logged(caplog, payload, encrypted):
+    """Undecodable payloads raise PayloadError and log nothing."""
+    with caplog.at_level(logging.DEBUG), pytest.raises(PayloadError):
+        decode_payload(payload, encrypted, KEY)
+    assert not caplog.records
+
+
+def test_missing_remtime_is_not_logged(caplog):
+    """A missing RemTime translates to Error without logging."""
+    with caplog.at_level(logging.DEBUG):
+        assert translate("statusDWash", "RemTime", None) == "Error"
+    assert not caplog.records
+    assert translate("statusDWash", "RemTime", "95") == "1 hours 35 minutes"
+
+
+def test_programs_by_name():
+    """Both sets of dishwasher program names and raw programs are accepted."""
+    assert untranslate_program("statusDWash", "Universal 60°C") == "P5"
+    assert untranslate_program("statusDWash", "Normal 60°C") == "P5"
+    assert untranslate_program("statusDWash", "P1 75°C") == "P2"
+    assert untranslate_program("statusLavatrice", "P19") == "P19"
+    assert untranslate_program("statusLavatrice", "Universal 60°C") is None
+    assert build_program_command("P8", eco="1") == (
+        "Program=P8&Eco=1&TreinUno=0&ExtraDry=0&StartStop=0&MetaCarico=0"
+    )
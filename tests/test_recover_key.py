@@ -0,0 +1,80 @@
+"""Tests for recovering the XOR key from an encrypted response."""
+
+from __future__ import annotations
+
+import binascii
+import json
+import random
+
+import pytest
+
+from protocol import STATUS_FIELDS, recover_key, xor_bytes
+
+VALUES = ["0", "1", "2", "5", "12", "E0", "95", "P5", "40"]
+
+
+def _response(device_type: str, seed: int, separators=(",", ":")) -> str:
+    """Return a plausible decrypted status response."""
+    rng = random.Random(seed)
+    status = {field: rng.choice(VALUES) for field in STATUS_FIELDS[device_type]}
+    return json.dumps({device_type: status}, separators=separators)
+
+
+def _key(length: int, seed: int) -> str:
+    """Return an alphanumeric key, as the appliances use."""
+    rng = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def _encrypt(plain: str, key: str) -> str:
+    """Encrypt a response as the appliance does."""
+    return binascii.hexlify(xor_bytes(plain.encode(), key.encode())).decode()
+
+
+@pytest.mark.parametrize("device_type", ["statusDWash", "statusLavatrice"])
+@pytest.mark.parametrize("length", [4, 8, 12, 16])
+def test_round_trip(device_type, length):
+    """The key of a compact response is recovered exactly."""
+    key = _key(length, seed=length)
+    plain = _response(device_type, seed=length)
+    assert recover_key(_encrypt(plain, key)) == key
+
+
+@pytest.mark.parametrize("device_type", ["statusDWash", "statusLavatrice"])
+def test_whitespace_and_trailing_newline(device_type):
+    """Spaces after the separators and a trailing newline are tolerated."""
+    key = _key(10, seed=3)
+    plain = _response(device_type, seed=3, separators=(", ", ": ")) + "\r\n"
+    recovered = recover_key(_encrypt(plain, key), (device_type,))
+    assert recovered == key
+
+
+def test_recovered_key_decrypts_other_responses():
+    """The key found for one response decrypts the following ones."""
+    key = _key(16, seed=7)
+    recovered = recover_key(_encrypt(_response("statusDWash", seed=1), key))
+    later = _encrypt(_response("statusDWash", seed=2), key)
+    plain = xor_bytes(binascii.unhexlify(later), recovered.encode())
+    assert json.loads(plain)["statusDWash"]
+
+
+@pytest.mark.parametrize(
+    "hex_data",
+    [
+        "",
+        "abc",
+        "not hex at all",
+        binascii.hexlify(bytes(range(256))).decode(),
+    ],
+)
+def test_failures(hex_data):
+    """Empty, odd length, non hex and random data give no key."""
+    assert recover_key(hex_data, max_key_length=16) is None
+
+
+def test_wrong_device_type():
+    """A response is not matched against a device type it does not start with."""
+    key = _key(8, seed=5)
+    plain = _response("statusLavatrice", seed=5)
+    assert recover_key(_encrypt(plain, key), ("statusDWash",)) is None
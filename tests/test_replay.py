@@ -0,0 +1,81 @@
+"""Tests for trace records and the decoding of a replayed cycle."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from protocol import decode_payload, translate_status
+from replay import TraceRecorder, make_record, read_trace
+
+
+def test_recorded_cycle_translates(trace_path):
+    """Every recorded payload decodes and translates like a live response."""
+    records = list(read_trace(trace_path))
+    assert len(records) == 10
+
+    states = []
+    for record in records:
+        if record["s"] != 200:
+            continue
+        data = decode_payload(record["p"], False, "")
+        states.append(translate_status("statusDWash", data))
+
+    assert [state["StatoDWash"] for state in states] == [
+        "IDLE",
+        "PRE_WASH",
+        "PRE_WASH",
+        "WASH",
+        "WASH",
+        "RINSE",
+        "RINSE",
+        "DRYING",
+        "FINISHED",
+    ]
+    assert states[3]["RemTime"] == "1 hours 59 minutes"
+    assert states[3]["Program"] == "Universal 60°C"
+    assert states[-1]["MissRinse"] == "Rinse Missing"
+
+
+def test_read_trace_round_trip(tmp_path):
+    """Records written by make_record are read back unchanged."""
+    path = tmp_path / "trace.jsonl"
+    records = [
+        make_record(1.0, 0.25, 200, "{}"),
+        make_record(31.0, 10.0, 0, ""),
+    ]
+    path.write_text("".join(json.dumps(record) + "\n" for record in records) + "\n")
+    assert list(read_trace(str(path))) == records
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "[1, 2, 3]",
+        '{"t": 1.0, "s": 200}',
+        '{"s": 200, "p": ""}',
+        '{"t": "now", "s": 200, "p": ""}',
+        "not json",
+    ],
+)
+def test_read_trace_rejects_malformed_records(tmp_path, line):
+    """Malformed lines raise ValueError, which the service reports."""
+    path = tmp_path / "trace.jsonl"
+    path.write_text(line + "\n")
+    with pytest.raises(ValueError):
+        list(read_trace(str(path)))
+
+
+def test_recorder_rotates_at_max_bytes(tmp_path):
+    """The trace is moved aside once it reaches its size bound."""
+    path = tmp_path / "trace.jsonl"
+    recorder = TraceRecorder(str(path), max_bytes=200)
+    for i in range(20):
+        recorder.append(make_record(float(i), 0.1, 200, "x" * 40))
+
+    assert path.stat().st_size < 200 + 100
+    assert (tmp_path / "trace.jsonl.1").stat().st_size >= 200
+    records = list(read_trace(str(tmp_path / "trace.jsonl.1")))
+    records += list(read_trace(str(path)))
+    assert records[-1]["t"] == 19.0
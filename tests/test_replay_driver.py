@@ -0,0 +1,42 @@
+"""Regression test replaying a recorded cycle through the sensors."""
+
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_replay_dishwasher_cycle(hass, integration, trace_path):
+    """The sensors follow a recorded cycle, including a failed poll."""
+    from candy_bianca.replay_driver import ReplayDriver
+
+    driver = ReplayDriver(hass, {"name": "Dishwasher", "device_type": "statusDWash"})
+    snapshots = await driver.async_replay(trace_path)
+    assert len(snapshots) == 10
+
+    states = [state for _, state in snapshots]
+    assert [state["Dishwasher Dishwasher Status"] for state in states] == [
+        "IDLE",
+        "PRE_WASH",
+        "PRE_WASH",
+        "WASH",
+        "WASH",
+        "WASH",
+        "RINSE",
+        "RINSE",
+        "DRYING",
+        "FINISHED",
+    ]
+    assert states[3]["Dishwasher Remaining Time"] == "1 hours 59 minutes"
+    assert states[3]["Dishwasher Remaining Minutes"] == 119
+    # The poll at minute 40 timed out: the countdown carries on locally
+    assert states[4]["Dishwasher Remaining Minutes"] == 109
+    assert states[5]["Dishwasher Remaining Minutes"] == 99
+    assert states[-1]["Dishwasher End Time"] is None
+
+    # The replay leaves the coordinator as it found it
+    assert driver.coordinator.json_data is None
+    assert not driver.coordinator.replaying
@@ -0,0 +1,102 @@
+"""Refresh triggers from other Home Assistant entities for candy_bianca."""
+
+from __future__ import annotations
+
+import logging
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.event import async_track_state_change_event
+
+from .const import DEFAULT_POWER_THRESHOLD, TRIGGER_COOLDOWN
+from .coordinator import CandyBiancaCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def parse_trigger_entities(value: str | list[str] | None) -> list[str]:
+    """Return the entity ids listed in the trigger_entities option."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [entity_id.strip() for entity_id in value if entity_id.strip()]
+
+
+def _above(state: str | None, threshold: float) -> bool | None:
+    """Return whether a numeric state is above the threshold, None if not numeric."""
+    try:
+        return float(state) > threshold
+    except (TypeError, ValueError):
+        return None
+
+
+def is_trigger_change(old: str | None, new: str | None, threshold: float) -> bool:
+    """Return True if a state change should refresh the appliance.
+
+    Numeric states (power sensors) trigger when they cross the threshold,
+    other states (door, vibration, plug switches) on any change.
+    """
+    if new in (None, STATE_UNAVAILABLE, STATE_UNKNOWN) or old in (
+        None,
+        STATE_UNAVAILABLE,
+        STATE_UNKNOWN,
+    ):
+        return False
+    old_above = _above(old, threshold)
+    new_above = _above(new, threshold)
+    if old_above is not None and new_above is not None:
+        return old_above != new_above
+    return old != new
+
+
+@callback
+def async_setup_triggers(
+    hass: HomeAssistant, entry: ConfigEntry, coordinator: CandyBiancaCoordinator
+) -> CALLBACK_TYPE | None:
+    """Refresh the coordinator when one of the trigger entities changes."""
+    entity_ids = parse_trigger_entities(entry.options.get("trigger_entities"))
+    if not entity_ids:
+        return None
+    if missing := [
+        entity_id for entity_id in entity_ids if not hass.states.get(entity_id)
+    ]:
+        _LOGGER.warning(
+            f"Refresh triggers for {coordinator.name} not found (yet): {missing}"
+        )
+
+    threshold = float(entry.options.get("power_threshold", DEFAULT_POWER_THRESHOLD))
+    debouncer = Debouncer(
+        hass,
+        _LOGGER,
+        cooldown=TRIGGER_COOLDOWN,
+        immediate=True,
+        function=coordinator.async_refresh,
+    )
+
+    @callback
+    def _async_state_changed(event: Event) -> None:
+        old_state = event.data.get("old_state")
+        new_state = event.data.get("new_state")
+        if not is_trigger_change(
+            old_state.state if old_state else None,
+            new_state.state if new_state else None,
+            threshold,
+        ):
+            return
+        _LOGGER.debug(
+            f"Refresh of {coordinator.name} triggered by {event.data['entity_id']}"
+        )
+        hass.async_create_task(debouncer.async_call())
+
+    unsub = async_track_state_change_event(hass, entity_ids, _async_state_changed)
+    _LOGGER.info(f"Refresh triggers for {coordinator.name}: {entity_ids}")
+
+    @callback
+    def _async_unsub() -> None:
+        unsub()
+        debouncer.async_cancel()
+
+    return _async_unsub